@@ -0,0 +1,121 @@
+"""Per-request authentication overhead: JWT bearer tokens vs cookie sessions.
+
+Usage: python -m benchmarks.auth [--requests 2000]
+
+The cookie path keeps the user id in the signed session cookie and loads
+the user from the database on each request, the JWT path reads the user
+from the verified token. JWT verification is measured with and without
+the verified-token cache.
+"""
+import argparse
+import asyncio
+import logging
+import time
+import timeit
+from typing import Optional
+from uuid import UUID
+
+import httpx
+from fastapi import Request
+
+from benchmarks.common import create_app, create_client, percentile
+from src.api.dependencies import SessionDep
+from src.auth.tokens import VerifiedTokenCache, get_access_tokens
+from src.crud.user import UserCRUD
+from src.utils.logger import logger
+
+
+async def session_login(request: Request, session: SessionDep) -> dict[str, str]:
+    user = await UserCRUD(session).find_by_login("benchmark")
+    request.session["user_id"] = str(user.id)  # type: ignore[union-attr]
+    return {}
+
+
+async def session_me(request: Request, session: SessionDep) -> dict[str, str]:
+    user = await UserCRUD(session).find(UUID(request.session["user_id"]))
+    return {"username": user.username}  # type: ignore[union-attr]
+
+
+def report(name: str, latencies: list[float]) -> None:
+    print(
+        f"{name:>16}: mean={sum(latencies) / len(latencies) * 1e6:.0f}us "
+        f"p50={percentile(latencies, 50) * 1e6:.0f}us "
+        f"p99={percentile(latencies, 99) * 1e6:.0f}us"
+    )
+
+
+async def timed(
+    client: httpx.AsyncClient,
+    url: str,
+    requests: int,
+    headers: Optional[dict[str, str]] = None,
+) -> list[float]:
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+
+    return latencies
+
+
+async def run(requests: int) -> None:
+    logger.level_no = logging.INFO
+
+    app, db = await create_app()
+    app.add_api_route("/benchmark/session/login", session_login, methods=["POST"])
+    app.add_api_route("/benchmark/session/me", session_me)
+
+    async with create_client(app) as client:
+        response = await client.post(
+            "/api/v1/auth/register",
+            json={
+                "email": "benchmark@example.com",
+                "username": "benchmark",
+                "password": "Benchmark1",
+            },
+        )
+        response.raise_for_status()
+
+        response = await client.post(
+            "/api/v1/auth/login",
+            json={"login": "benchmark", "password": "Benchmark1"},
+        )
+        token = response.json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        (await client.post("/benchmark/session/login")).raise_for_status()
+
+        tokens = get_access_tokens()
+        cache = tokens.cache
+
+        session_me_latencies = await timed(client, "/benchmark/session/me", requests)
+        report("cookie session", session_me_latencies)
+        report("jwt cached", await timed(client, "/api/v1/auth/me", requests, headers))
+
+        tokens.cache = VerifiedTokenCache(0)
+        uncached_latencies = await timed(client, "/api/v1/auth/me", requests, headers)
+        report("jwt uncached", uncached_latencies)
+
+    number = 10_000
+    uncached = timeit.timeit(lambda: tokens.verify(token), number=number)
+    tokens.cache = cache
+    cached = timeit.timeit(lambda: tokens.verify(token), number=number)
+    print(
+        f"verify: uncached={uncached / number * 1e6:.1f}us "
+        f"cached={cached / number * 1e6:.2f}us"
+    )
+
+    await db.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
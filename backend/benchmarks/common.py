@@ -0,0 +1,73 @@
+"""Shared helpers for running the application in-process during benchmarks."""
+import os
+import tempfile
+from pathlib import Path
+from typing import Sequence
+
+# Settings are required at import time, so provide throwaway values
+# before anything from `src` is imported.
+BENCHMARK_ENV = {
+    "PROJECT_NAME": "benchmark",
+    "POSTGRES_DRIVER": "asyncpg",
+    "POSTGRES_HOST": "localhost",
+    "POSTGRES_PORT": "5432",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_DB": "postgres",
+    "AUTH_GOOGLE_CLIENT_ID": "benchmark",
+    "AUTH_GOOGLE_CLIENT_SECRET": "benchmark",
+    # every request comes from the same client
+    "LIMITS_AUTH_RATE": "0",
+    "LIMITS_AVAILABILITY_RATE": "0",
+    # bursts of registrations wait for a hashing slot instead of being shed
+    "LIMITS_HASHING_QUEUE": "10000",
+    "LIMITS_QUEUE_TIMEOUT": "600",
+}
+for _key, _value in BENCHMARK_ENV.items():
+    os.environ.setdefault(_key, _value)
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from loguru import logger as _loguru_logger  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from src.db import get_session, get_unit_of_work, instrument_engine  # noqa: E402
+from src.db.session import DatabaseHP  # noqa: E402
+from src.main import configure_app  # noqa: E402
+
+
+def sqlite_url(directory: str | None = None) -> str:
+    directory = directory or tempfile.mkdtemp(prefix="benchmark-")
+    return f"sqlite+aiosqlite:///{Path(directory) / 'benchmark.db'}"
+
+
+async def create_app(url: str | None = None) -> tuple[FastAPI, DatabaseHP]:
+    """Build the application with its database replaced by a local one."""
+    app = configure_app()
+    _loguru_logger.remove()
+
+    db = DatabaseHP(url=url or sqlite_url())
+    instrument_engine(db.engine)
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+
+    app.dependency_overrides[get_session] = db.session_dependency
+    app.dependency_overrides[get_unit_of_work] = db.unit_of_work_dependency
+
+    return app, db
+
+
+def create_client(app: FastAPI) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),  # type: ignore[arg-type]
+        base_url="http://benchmark",
+    )
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+    return ordered[index]
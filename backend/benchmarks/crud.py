@@ -0,0 +1,120 @@
+"""Per-call overhead of CRUDBase.find/update/delete.
+
+Compares statements built on every call (the previous behaviour) with the
+statements CRUDBase now builds once per model.
+
+Usage: python -m benchmarks.crud [--calls 2000]
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from uuid import UUID
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel, delete, select
+
+from benchmarks.common import sqlite_url
+from src.crud.user import UserCRUD
+from src.db.session import DatabaseHP
+from src.models.user import User, UserUpdate
+from src.utils.logger import logger
+
+
+class AdhocUserCRUD(UserCRUD):
+    """UserCRUD building its statements on every call."""
+
+    async def find(self, id: UUID) -> Optional[User]:
+        stmt = select(self.model).where(self.model.id == id)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def delete(self, id: UUID) -> None:
+        async with self.session.begin():
+            stmt = delete(self.model).where(self.model.id == id)
+            await self.session.execute(stmt)
+
+
+async def seed(db: DatabaseHP, count: int) -> list[UUID]:
+    ids = [uuid.uuid4() for _ in range(count)]
+    async with db.get_session() as session:
+        await session.execute(
+            insert(User),
+            [
+                {
+                    "id": id,
+                    "email": f"{id}@example.com",
+                    "username": f"user_{id.hex}",
+                    "hashed_password": "x",
+                    "is_admin": False,
+                    "is_active": True,
+                    "date_joined": datetime.utcnow(),
+                }
+                for id in ids
+            ],
+        )
+        await session.commit()
+
+    return ids
+
+
+async def timed(calls: list[Callable[[], Awaitable[object]]]) -> float:
+    started = time.perf_counter()
+    for call in calls:
+        await call()
+    return (time.perf_counter() - started) / len(calls) * 1e6
+
+
+async def measure(crud_class: type[UserCRUD], calls: int) -> dict[str, float]:
+    db = DatabaseHP(url=sqlite_url())
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    ids = await seed(db, calls)
+
+    results = {}
+    async with db.get_session() as session:
+        crud = crud_class(session)
+        results["find"] = await timed([lambda id=id: crud.find(id) for id in ids])
+
+        users = [await crud.find(id) for id in ids]
+        results["update"] = await timed(
+            [
+                lambda user=user: crud.update(user, UserUpdate(is_admin=True))
+                for user in users
+            ]
+        )
+        session.expunge_all()
+
+        results["delete"] = await timed([lambda id=id: crud.delete(id) for id in ids])
+
+    await db.engine.dispose()
+    return results
+
+
+async def run(calls: int) -> None:
+    # debug logging of the statement would dominate the measurement
+    logger.level_no = logging.INFO
+
+    for name, crud_class in (("adhoc", AdhocUserCRUD), ("cached", UserCRUD)):
+        # warm up imports, compiled caches and the sqlite file
+        await measure(crud_class, 50)
+        result = await measure(crud_class, calls)
+        print(
+            f"{name:>7}: "
+            + " ".join(f"{key}={value:.1f}us" for key, value in result.items())
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.calls))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Latency of `/test/` while registrations hash passwords concurrently.
+
+Usage: python -m benchmarks.hashing [--registrations 32] [--executor thread]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import create_app, create_client, percentile
+from src.core.config import get_settings
+from src.core.security import shutdown_hashing_pool
+
+
+async def measure(executor: str, registrations: int) -> dict[str, float]:
+    get_settings().hasher.executor = executor  # type: ignore[assignment]
+    shutdown_hashing_pool()
+
+    app, db = await create_app()
+    latencies: list[float] = []
+
+    async with create_client(app) as client:
+
+        async def register(index: int) -> None:
+            response = await client.post(
+                "/api/v1/auth/register",
+                json={
+                    "email": f"user{index}@example.com",
+                    "username": f"user_{index}",
+                    "password": "Benchmark1",
+                },
+            )
+            response.raise_for_status()
+
+        started = time.perf_counter()
+        signups = asyncio.gather(*(register(i) for i in range(registrations)))
+
+        while not signups.done():
+            probe_started = time.perf_counter()
+            await client.get("/api/v1/test/")
+            latencies.append(time.perf_counter() - probe_started)
+
+        await signups
+        elapsed = time.perf_counter() - started
+
+    await db.engine.dispose()
+    shutdown_hashing_pool()
+
+    return {
+        "probes": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=0) * 1000,
+        "total_s": elapsed,
+    }
+
+
+async def run(registrations: int, executors: list[str]) -> None:
+    for executor in executors:
+        result = await measure(executor, registrations)
+        print(
+            f"{executor:>7}: probes={result['probes']:<5} "
+            f"p50={result['p50_ms']:.2f}ms p99={result['p99_ms']:.2f}ms "
+            f"max={result['max_ms']:.2f}ms registrations={result['total_s']:.2f}s"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--registrations", type=int, default=32)
+    parser.add_argument(
+        "--executor",
+        action="append",
+        choices=["inline", "thread", "process"],
+        help="hasher executor to measure, may be repeated (default: inline, thread)",
+    )
+    args = parser.parse_args()
+
+    asyncio.run(run(args.registrations, args.executor or ["inline", "thread"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Google login callback latency against a local fake OIDC provider.
+
+Usage: python -m benchmarks.oidc [--logins 50]
+
+Compares authlib's default app, which fetches discovery metadata and JWKS
+and opens new connections per login, with the cached app that uses the
+OIDC document cache and the shared connection pool. The provider counts
+the requests and TCP connections it receives.
+"""
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from collections import Counter
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+import uvicorn
+from authlib.integrations.starlette_client import OAuth
+from authlib.jose import JsonWebKey, jwt
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+import src.auth.oauth
+from benchmarks.common import create_app, create_client, percentile
+from src.auth.oidc import get_oidc_cache
+from src.core.config import get_settings
+from src.core.http import close_http_client
+
+
+class FakeProvider:
+    """OIDC provider that signs an id_token for whatever nonce the code carries."""
+
+    def __init__(self, client_id: str) -> None:
+        self.client_id = client_id
+        self.key = JsonWebKey.generate_key("RSA", 2048, is_private=True)
+        self.key_id = "benchmark"
+        self.requests: Counter[str] = Counter()
+        self.connections: set[tuple[str, int]] = set()
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+
+        self.issuer = f"http://127.0.0.1:{self.port}"
+        self.app = Starlette(
+            routes=[
+                Route("/.well-known/openid-configuration", self.discovery),
+                Route("/jwks", self.jwks),
+                Route("/token", self.token, methods=["POST"]),
+            ]
+        )
+        self.server = uvicorn.Server(
+            uvicorn.Config(self.app, port=self.port, log_level="warning")
+        )
+
+    def track(self, request: Request) -> None:
+        self.requests[request.url.path] += 1
+        if request.client is not None:
+            self.connections.add((request.client.host, request.client.port))
+
+    async def discovery(self, request: Request) -> JSONResponse:
+        self.track(request)
+        return JSONResponse(
+            {
+                "issuer": self.issuer,
+                "authorization_endpoint": f"{self.issuer}/authorize",
+                "token_endpoint": f"{self.issuer}/token",
+                "jwks_uri": f"{self.issuer}/jwks",
+                "id_token_signing_alg_values_supported": ["RS256"],
+            },
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
+
+    async def jwks(self, request: Request) -> JSONResponse:
+        self.track(request)
+        public_key = self.key.as_dict(is_private=False)
+        return JSONResponse(
+            {"keys": [{**public_key, "kid": self.key_id, "use": "sig"}]},
+            headers={"Cache-Control": "public, max-age=3600"},
+        )
+
+    async def token(self, request: Request) -> JSONResponse:
+        self.track(request)
+        form = parse_qs((await request.body()).decode())
+        now = int(time.time())
+        claims = {
+            "iss": self.issuer,
+            "aud": self.client_id,
+            "sub": "benchmark",
+            "email": "benchmark@example.com",
+            "email_verified": True,
+            "nonce": form["code"][0],
+            "iat": now,
+            "exp": now + 3600,
+        }
+        id_token = jwt.encode(
+            {"alg": "RS256", "kid": self.key_id}, claims, self.key
+        ).decode()
+        return JSONResponse(
+            {
+                "access_token": "benchmark",
+                "token_type": "Bearer",
+                "expires_in": 3600,
+                "id_token": id_token,
+            }
+        )
+
+    def start(self) -> None:
+        threading.Thread(target=self.server.run, daemon=True).start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+
+    def reset(self) -> None:
+        self.requests.clear()
+        self.connections.clear()
+
+
+def default_oauth() -> Any:
+    """The OAuth registry as it was before the OIDC cache."""
+    settings = get_settings()
+    oauth = OAuth()
+    oauth.register(
+        name="google",
+        client_id=settings.auth.google.client_id,
+        client_secret=settings.auth.google.client_secret,
+        server_metadata_url=settings.auth.oidc.google_metadata_url,
+        client_kwargs={"scope": "openid email profile"},
+    )
+    return oauth
+
+
+async def measure(provider: FakeProvider, cached: bool, logins: int) -> None:
+    get_oidc_cache.cache_clear()
+    await close_http_client()
+    src.auth.oauth.get_oauth.cache_clear()
+    # the client dependency looks get_oauth up in its module on every call
+    original_get_oauth = src.auth.oauth.get_oauth
+    if not cached:
+        oauth = default_oauth()
+        src.auth.oauth.get_oauth = lambda: oauth  # type: ignore
+
+    app, db = await create_app()
+    latencies: list[float] = []
+    provider.reset()
+
+    try:
+        async with create_client(app) as client:
+            for _ in range(logins):
+                response = await client.get("/api/v1/auth/login/google")
+                query = parse_qs(urlparse(response.headers["location"]).query)
+
+                started = time.perf_counter()
+                response = await client.get(
+                    "/api/v1/auth/auth/google",
+                    params={"code": query["nonce"][0], "state": query["state"][0]},
+                )
+                latencies.append(time.perf_counter() - started)
+                assert "access_token" in response.json(), response.text
+    finally:
+        src.auth.oauth.get_oauth = original_get_oauth
+        await db.engine.dispose()
+        await close_http_client()
+
+    name = "cached" if cached else "default"
+    print(
+        f"{name:>7}: p50={percentile(latencies, 50) * 1000:.2f}ms "
+        f"p99={percentile(latencies, 99) * 1000:.2f}ms "
+        f"provider requests={dict(provider.requests)} "
+        f"connections={len(provider.connections)}"
+    )
+
+
+async def run(logins: int) -> None:
+    provider = FakeProvider(get_settings().auth.google.client_id)
+    provider.start()
+    get_settings().auth.oidc.google_metadata_url = (
+        f"{provider.issuer}/.well-known/openid-configuration"
+    )
+
+    try:
+        await measure(provider, cached=False, logins=logins)
+        await measure(provider, cached=True, logins=logins)
+    finally:
+        provider.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.logins))
+
+
+if __name__ == "__main__":
+    main()
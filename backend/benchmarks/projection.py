@@ -0,0 +1,116 @@
+"""CPU time and memory of reading users as ORM instances or as rows.
+
+Usage: python -m benchmarks.projection [--rows 10000] [--repeat 5]
+
+Reads the same page with CRUDBase.find_many, which builds and tracks User
+instances, and with CRUDBase.find_rows selecting only the UserRead columns,
+and renders it with the UserRead serializer as the list endpoint does.
+Results are scaled to 10k rows; CPU time is the best of `--repeat` runs,
+memory is the peak traced while reading and rendering.
+"""
+import argparse
+import asyncio
+import logging
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel
+
+from benchmarks.common import sqlite_url
+from src.api.responses import serializer_for
+from src.crud.user import UserCRUD
+from src.db.session import DatabaseHP
+from src.models.user import User, UserRead
+from src.utils.logger import logger
+
+
+async def seed(db: DatabaseHP, count: int) -> None:
+    async with db.get_session() as session:
+        await session.execute(
+            insert(User),
+            [
+                {
+                    "id": id,
+                    "email": f"{id}@example.com",
+                    "username": f"user_{id.hex}",
+                    "hashed_password": "$2b$12$" + "x" * 53,
+                    "is_admin": False,
+                    "is_active": True,
+                    "date_joined": datetime.utcnow(),
+                    "last_login": datetime.utcnow(),
+                }
+                for id in (uuid.uuid4() for _ in range(count))
+            ],
+        )
+        await session.commit()
+
+
+async def measure(
+    db: DatabaseHP, read: Callable[[UserCRUD], Awaitable[list[Any]]], repeat: int
+) -> tuple[float, float, int]:
+    """Best CPU and wall seconds of `repeat` runs, and peak traced bytes."""
+    serializer = serializer_for(UserRead)
+
+    async def run() -> None:
+        async with db.get_session() as session:
+            serializer.dumps_many(await read(UserCRUD(session)))
+
+    cpu = wall = float("inf")
+    for _ in range(repeat):
+        started_cpu, started_wall = time.process_time(), time.perf_counter()
+        await run()
+        cpu = min(cpu, time.process_time() - started_cpu)
+        wall = min(wall, time.perf_counter() - started_wall)
+
+    tracemalloc.start()
+    await run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return cpu, wall, peak
+
+
+async def run(rows: int, repeat: int) -> None:
+    # debug logging of the statement would dominate the measurement
+    logger.level_no = logging.INFO
+
+    db = DatabaseHP(url=sqlite_url())
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    await seed(db, rows)
+
+    candidates = {
+        "find_many": lambda crud: crud.find_many(limit=rows),
+        "find_rows": lambda crud: crud.find_rows(UserRead.model_fields, limit=rows),
+    }
+    # warm up imports, compiled caches and the sqlite file
+    for read in candidates.values():
+        await measure(db, read, 1)
+
+    scale = 10_000 / rows
+    for name, read in candidates.items():
+        cpu, wall, peak = await measure(db, read, repeat)
+        print(
+            f"{name:>10}: cpu={cpu * scale * 1000:8.1f}ms "
+            f"wall={wall * scale * 1000:8.1f}ms "
+            f"peak={peak * scale / 2**20:7.1f}MiB per 10k rows"
+        )
+
+    await db.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Response serialization throughput for users.
+
+Usage: python -m benchmarks.serialization [--users 100] [--seconds 1]
+
+Compares the serializers directly, then the same list endpoint rendered
+through FastAPI's response model with JSONResponse and ORJSONResponse and
+as a pre-rendered `model_response`.
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from pydantic import TypeAdapter
+
+from benchmarks.common import create_app, create_client
+from src.api.responses import model_response, serializer_for
+from src.models.user import User, UserRead
+
+
+def make_users(count: int) -> list[User]:
+    return [
+        User(
+            email=f"user{index}@example.com",
+            username=f"user_{index}",
+            hashed_password="$2b$12$" + "x" * 53,
+            last_login=datetime.utcnow(),
+        )
+        for index in range(count)
+    ]
+
+
+def throughput(func: Callable[[], Any], seconds: float) -> float:
+    calls = 0
+    started = time.perf_counter()
+    while (elapsed := time.perf_counter() - started) < seconds:
+        for _ in range(10):
+            func()
+        calls += 10
+
+    return calls / elapsed
+
+
+def serializers(users: list[User], seconds: float) -> None:
+    serializer = serializer_for(UserRead)
+    adapter = TypeAdapter(list[UserRead])
+
+    def jsonable() -> str:
+        return json.dumps(
+            jsonable_encoder([UserRead.model_validate(user) for user in users])
+        )
+
+    def pydantic() -> bytes:
+        return adapter.dump_json([UserRead.model_validate(user) for user in users])
+
+    candidates = {
+        "jsonable_encoder + json": jsonable,
+        "pydantic dump_json": pydantic,
+        "ModelSerializer": lambda: serializer.dumps_many(users),
+    }
+    for name, func in candidates.items():
+        rate = throughput(func, seconds)
+        print(f"{name:>24}: {rate:10.0f} lists/s {rate * len(users):12.0f} users/s")
+
+
+async def endpoints(users: list[User], seconds: float) -> None:
+    app, db = await create_app()
+
+    async def response_model() -> list[UserRead]:
+        return users  # type: ignore[return-value]
+
+    async def pre_rendered() -> Response:
+        return model_response(UserRead, users)
+
+    app.add_api_route("/json", response_model, response_class=JSONResponse)
+    app.add_api_route("/orjson", response_model, response_class=ORJSONResponse)
+    app.add_api_route("/model-response", pre_rendered, response_model=list[UserRead])
+
+    async with create_client(app) as client:
+        for path in ("/json", "/orjson", "/model-response"):
+            calls = 0
+            started = time.perf_counter()
+            while (elapsed := time.perf_counter() - started) < seconds:
+                (await client.get(path)).raise_for_status()
+                calls += 1
+            print(f"{path:>24}: {calls / elapsed:10.0f} requests/s")
+
+    await db.engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=1)
+    args = parser.parse_args()
+
+    users = make_users(args.users)
+    serializers(users, args.seconds)
+    asyncio.run(endpoints(users, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
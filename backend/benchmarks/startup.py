@@ -0,0 +1,181 @@
+"""Import-time budget and time-to-first-request of a fresh worker.
+
+Usage:
+    python -m benchmarks.startup imports [--top 25] [--budget-ms 1500]
+    python -m benchmarks.startup first-request [--runs 5]
+
+`imports` runs `configure_app()` in a fresh interpreter with `-X importtime`
+and reports the modules and top-level packages with the largest import
+cost. With --budget-ms it exits with status 1 when import plus
+configure_app() time exceeds the budget.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import NamedTuple
+
+import httpx
+
+from benchmarks.common import BENCHMARK_ENV
+
+BACKEND_FOLDER = Path(__file__).parent.parent
+
+STARTUP_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from src.main import configure_app
+imported = time.perf_counter()
+configure_app()
+configured = time.perf_counter()
+print(json.dumps({"import_s": imported - started, "configure_s": configured - imported}))
+"""
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def environment() -> dict[str, str]:
+    return {**BENCHMARK_ENV, **os.environ, "PYTHONPATH": str(BACKEND_FOLDER)}
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    records = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        records.append(
+            ImportRecord(name.strip(), int(self_us), int(cumulative_us), depth)
+        )
+
+    return records
+
+
+def report_imports(top: int, budget_ms: float | None) -> int:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        capture_output=True,
+        text=True,
+        cwd=BACKEND_FOLDER,
+        env=environment(),
+        check=True,
+    )
+    timings = json.loads(process.stdout.strip().splitlines()[-1])
+    records = parse_importtime(process.stderr)
+
+    by_package: dict[str, int] = defaultdict(int)
+    for record in records:
+        by_package[record.module.split(".")[0]] += record.self_us
+
+    print(f"{'module':<60} {'self ms':>9} {'total ms':>9}")
+    for record in sorted(records, key=lambda r: r.self_us, reverse=True)[:top]:
+        print(
+            f"{record.module:<60} {record.self_us / 1000:>9.1f} "
+            f"{record.cumulative_us / 1000:>9.1f}"
+        )
+
+    print(f"\n{'package':<60} {'self ms':>9}")
+    for package, self_us in sorted(
+        by_package.items(), key=lambda item: item[1], reverse=True
+    )[:top]:
+        print(f"{package:<60} {self_us / 1000:>9.1f}")
+
+    total_ms = (timings["import_s"] + timings["configure_s"]) * 1000
+    print(
+        f"\nimport src.main: {timings['import_s'] * 1000:.1f}ms, "
+        f"configure_app(): {timings['configure_s'] * 1000:.1f}ms, "
+        f"total: {total_ms:.1f}ms"
+    )
+
+    if budget_ms is not None and total_ms > budget_ms:
+        print(f"over budget by {total_ms - budget_ms:.1f}ms")
+        return 1
+
+    return 0
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(timeout: float = 30) -> float:
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/api/v1/test/"
+
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.main:configure_app",
+            "--factory",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=BACKEND_FOLDER,
+        env=environment(),
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(url, timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.TransportError:
+                time.sleep(0.005)
+
+        raise TimeoutError(f"worker did not answer within {timeout}s")
+    finally:
+        worker.terminate()
+        worker.wait()
+
+
+def report_first_request(runs: int) -> int:
+    results = [time_to_first_request() for _ in range(runs)]
+    print(
+        f"time to first request over {runs} runs: "
+        f"min={min(results) * 1000:.0f}ms "
+        f"median={sorted(results)[len(results) // 2] * 1000:.0f}ms "
+        f"max={max(results) * 1000:.0f}ms"
+    )
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("imports")
+    imports.add_argument("--top", type=int, default=25)
+    imports.add_argument("--budget-ms", type=float)
+
+    first_request = commands.add_parser("first-request")
+    first_request.add_argument("--runs", type=int, default=5)
+
+    args = parser.parse_args()
+    if args.command == "imports":
+        sys.exit(report_imports(args.top, args.budget_ms))
+    sys.exit(report_first_request(args.runs))
+
+
+if __name__ == "__main__":
+    main()
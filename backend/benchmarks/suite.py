@@ -0,0 +1,413 @@
+"""API load and latency suite, run in-process against a local database.
+
+Usage:
+    python -m benchmarks.suite [--requests 500] [--hashing-requests 40]
+        [--concurrency 8]
+        [--scenario ping ...] [--database-url URL]
+        [--output results.json] [--compare baseline.json] [--threshold 10]
+
+Each scenario drives `configure_app()` over the ASGI transport and reports
+throughput, p50/p95/p99 latency, and memory allocated per request: the
+peak traced by tracemalloc during a request and what is still held after
+it. The database is a throwaway SQLite file unless --database-url points
+at e.g. a local Postgres.
+
+Results are written as JSON, by default to benchmarks/results/<commit>.json.
+With --compare, the run is diffed against an earlier result. The command
+exits with status 1 when a metric regresses by more than --threshold percent.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+import httpx
+
+from benchmarks.common import create_app, create_client, percentile
+from src.auth.tokens import get_access_tokens
+
+RESULTS_FOLDER = Path(__file__).parent / "results"
+PASSWORD = "Benchmark1"
+
+# metric -> True when higher is better
+COMPARED_METRICS = {
+    "throughput_rps": True,
+    "p50_ms": False,
+    "p95_ms": False,
+    "p99_ms": False,
+    "peak_alloc_kib": False,
+}
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str
+    # returns the function sending the n-th request
+    prepare: Callable[[httpx.AsyncClient], Awaitable[Request]]
+    # bcrypt bound, run with --hashing-requests instead of --requests
+    hashes: bool = False
+
+
+@dataclass
+class ScenarioResult:
+    requests: int
+    concurrency: int
+    errors: int
+    throughput_rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_alloc_kib: float
+    retained_kib: float
+    status_codes: dict[str, int] = field(default_factory=dict)
+
+
+# Registration payloads must be unique, each run gets its own prefix.
+_run_ids = itertools.count()
+
+
+def user_payload(prefix: str, index: int) -> dict[str, str]:
+    return {
+        "email": f"{prefix}{index}@example.com",
+        "username": f"{prefix}_{index}",
+        "password": PASSWORD,
+    }
+
+
+async def register_user(client: httpx.AsyncClient, prefix: str) -> dict[str, str]:
+    payload = user_payload(prefix, 0)
+    (await client.post("/api/v1/auth/register", json=payload)).raise_for_status()
+    return payload
+
+
+async def login_headers(
+    client: httpx.AsyncClient, payload: dict[str, str]
+) -> dict[str, str]:
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"login": payload["username"], "password": PASSWORD},
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def admin_headers() -> dict[str, str]:
+    # admins cannot be made through the API, sign a token for one instead
+    token = get_access_tokens().issue(uuid.uuid4(), "benchmark_admin", is_admin=True)
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def prepare_ping(client: httpx.AsyncClient) -> Request:
+    async def request(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.get("/api/v1/test/")
+
+    return request
+
+
+async def prepare_register(client: httpx.AsyncClient) -> Request:
+    prefix = f"register{next(_run_ids)}"
+
+    async def request(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.post(
+            "/api/v1/auth/register", json=user_payload(prefix, index)
+        )
+
+    return request
+
+
+async def prepare_create_user(client: httpx.AsyncClient) -> Request:
+    prefix = f"create{next(_run_ids)}"
+
+    async def request(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.post(
+            "/api/v1/test/create_user", json=user_payload(prefix, index)
+        )
+
+    return request
+
+
+async def prepare_login(client: httpx.AsyncClient) -> Request:
+    payload = await register_user(client, f"login{next(_run_ids)}")
+    credentials = {"login": payload["username"], "password": PASSWORD}
+
+    async def request(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.post("/api/v1/auth/login", json=credentials)
+
+    return request
+
+
+async def prepare_me(client: httpx.AsyncClient) -> Request:
+    payload = await register_user(client, f"me{next(_run_ids)}")
+    headers = await login_headers(client, payload)
+
+    async def request(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.get("/api/v1/auth/me", headers=headers)
+
+    return request
+
+
+async def prepare_list_users(client: httpx.AsyncClient) -> Request:
+    prefix = f"list{next(_run_ids)}"
+    for index in range(50):
+        payload = user_payload(prefix, index)
+        (await client.post("/api/v1/auth/register", json=payload)).raise_for_status()
+    headers = admin_headers()
+
+    async def request(client: httpx.AsyncClient, index: int) -> httpx.Response:
+        return await client.get("/api/v1/users/", params={"limit": 50}, headers=headers)
+
+    return request
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("ping", "GET /test/", prepare_ping),
+        Scenario("register", "POST /auth/register", prepare_register, hashes=True),
+        Scenario(
+            "create_user",
+            "POST /test/create_user: create, delete, recreate, update, find",
+            prepare_create_user,
+            hashes=True,
+        ),
+        Scenario("login", "POST /auth/login", prepare_login, hashes=True),
+        Scenario("me", "GET /auth/me with a bearer token", prepare_me),
+        Scenario("list_users", "GET /users/, 50 users per page", prepare_list_users),
+    )
+}
+
+
+async def measure_load(
+    client: httpx.AsyncClient, request: Request, requests: int, concurrency: int
+) -> tuple[list[float], dict[str, int], float]:
+    latencies: list[float] = []
+    status_codes: dict[str, int] = {}
+    indexes = iter(range(requests))
+
+    async def worker() -> None:
+        for index in indexes:
+            started = time.perf_counter()
+            response = await request(client, index)
+            latencies.append(time.perf_counter() - started)
+            code = str(response.status_code)
+            status_codes[code] = status_codes.get(code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return latencies, status_codes, time.perf_counter() - started
+
+
+async def measure_allocations(
+    client: httpx.AsyncClient, request: Request, requests: int, offset: int
+) -> tuple[float, float]:
+    """Mean peak and retained KiB per request, measured sequentially."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for index in range(offset, offset + requests):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            await request(client, index)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - current)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return (
+        sum(peaks) / len(peaks) / 1024,
+        (after - before) / requests / 1024,
+    )
+
+
+async def run_scenario(
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    alloc_requests: int,
+    database_url: Optional[str],
+) -> ScenarioResult:
+    app, db = await create_app(database_url)
+    try:
+        async with create_client(app) as client:
+            request = await scenario.prepare(client)
+            for index in range(warmup):
+                await request(client, requests + index)
+
+            latencies, status_codes, elapsed = await measure_load(
+                client, request, requests, concurrency
+            )
+            peak_alloc, retained = await measure_allocations(
+                client, request, alloc_requests, requests + warmup
+            )
+    finally:
+        await db.engine.dispose()
+
+    errors = sum(count for code, count in status_codes.items() if int(code) >= 400)
+    return ScenarioResult(
+        requests=requests,
+        concurrency=concurrency,
+        errors=errors,
+        throughput_rps=requests / elapsed,
+        p50_ms=percentile(latencies, 50) * 1000,
+        p95_ms=percentile(latencies, 95) * 1000,
+        p99_ms=percentile(latencies, 99) * 1000,
+        peak_alloc_kib=peak_alloc,
+        retained_kib=retained,
+        status_codes=status_codes,
+    )
+
+
+def git_revision() -> tuple[str, bool]:
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=False
+        ).stdout.strip()
+
+    return git("rev-parse", "--short", "HEAD") or "unknown", bool(
+        git("status", "--porcelain", "--untracked-files=no")
+    )
+
+
+def print_result(name: str, result: ScenarioResult) -> None:
+    print(
+        f"{name:>12}: {result.throughput_rps:8.1f} req/s  "
+        f"p50={result.p50_ms:7.2f}ms p95={result.p95_ms:7.2f}ms "
+        f"p99={result.p99_ms:7.2f}ms  peak={result.peak_alloc_kib:7.1f}KiB "
+        f"retained={result.retained_kib:6.2f}KiB  errors={result.errors}"
+    )
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """Print metric changes against `baseline`, returns the regressions."""
+    regressions = []
+    print(f"\ncompared with {baseline['commit']} ({baseline['timestamp']})")
+    for name, result in current["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = previous[metric], result[metric]
+            if not before:
+                continue
+
+            change = (after - before) / before * 100
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append(f"{name}.{metric}")
+            flag = "!" if worse > threshold else ""
+            changes.append(f"{metric}={change:+.1f}%{flag}")
+
+        print(f"{name:>12}: {' '.join(changes)}")
+
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> int:
+    commit, dirty = git_revision()
+    results: dict[str, Any] = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "requests": args.requests,
+            "hashing_requests": args.hashing_requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "alloc_requests": args.alloc_requests,
+            "database": "custom" if args.database_url else "sqlite",
+        },
+        "scenarios": {},
+    }
+
+    for name in args.scenario or list(SCENARIOS):
+        scenario = SCENARIOS[name]
+        result = await run_scenario(
+            scenario,
+            requests=args.hashing_requests if scenario.hashes else args.requests,
+            concurrency=args.concurrency,
+            warmup=args.warmup,
+            alloc_requests=args.alloc_requests,
+            database_url=args.database_url,
+        )
+        print_result(name, result)
+        results["scenarios"][name] = asdict(result)
+
+    name = f"{commit}-dirty" if dirty else commit
+    output = args.output or RESULTS_FOLDER / f"{name}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2) + "\n")
+    print(f"\nresults written to {output}")
+
+    if args.compare is None:
+        return 0
+
+    baseline = json.loads(args.compare.read_text())
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"regressions over {args.threshold}%: {', '.join(regressions)}")
+        return 1
+
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument(
+        "--hashing-requests",
+        type=int,
+        default=40,
+        help="requests for scenarios that hash or verify passwords",
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument(
+        "--alloc-requests",
+        type=int,
+        default=50,
+        help="sequential requests traced for allocation figures",
+    )
+    parser.add_argument(
+        "--scenario", action="append", choices=list(SCENARIOS), help="may be repeated"
+    )
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--compare", type=Path, help="earlier results to diff against")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10,
+        help="percent change counted as a regression",
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
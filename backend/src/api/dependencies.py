@@ -1,13 +1,64 @@
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated, Any, Optional
 
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.auth.oauth import OAuth, StarletteOAuth2App, create_client_dep, get_oauth
+from src.auth.oauth import create_client_dep, get_oauth
+from src.auth.tokens import TokenError, TokenUser, get_access_tokens
 from src.core.config import Settings, get_settings
-from src.db import get_session
+from src.db import get_database, get_session, get_unit_of_work
+from src.db.session import DatabaseHP
 
 SettingsDep = Annotated[Settings, Depends(get_settings)]
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
-OAuthDep = Annotated[OAuth, Depends(get_oauth)]
-GoogleOAuthDep = Annotated[StarletteOAuth2App, Depends(create_client_dep("google"))]
+# session whose CRUD calls only flush, committed once at the end of the request
+UnitOfWorkDep = Annotated[AsyncSession, Depends(get_unit_of_work)]
+DatabaseDep = Annotated[DatabaseHP, Depends(get_database)]
+
+if TYPE_CHECKING:
+    from authlib.integrations.starlette_client import OAuth, StarletteOAuth2App
+
+    OAuthDep = Annotated[OAuth, Depends(get_oauth)]
+    GoogleOAuthDep = Annotated[StarletteOAuth2App, Depends(create_client_dep("google"))]
+else:
+    # authlib is imported lazily, see src.auth.oauth
+    OAuthDep = Annotated[Any, Depends(get_oauth)]
+    GoogleOAuthDep = Annotated[Any, Depends(create_client_dep("google"))]
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+async def get_current_user(
+    credentials: Annotated[
+        Optional[HTTPAuthorizationCredentials], Depends(bearer_scheme)
+    ],
+) -> TokenUser:
+    if credentials is None:
+        raise HTTPException(
+            status.HTTP_401_UNAUTHORIZED,
+            "Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    try:
+        return get_access_tokens().verify(credentials.credentials)
+    except TokenError as e:
+        raise HTTPException(
+            status.HTTP_401_UNAUTHORIZED,
+            str(e),
+            headers={"WWW-Authenticate": 'Bearer error="invalid_token"'},
+        )
+
+
+CurrentUserDep = Annotated[TokenUser, Depends(get_current_user)]
+
+
+async def get_current_admin(user: CurrentUserDep) -> TokenUser:
+    if not user.is_admin:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Admin rights required")
+
+    return user
+
+
+AdminUserDep = Annotated[TokenUser, Depends(get_current_admin)]
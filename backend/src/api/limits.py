@@ -0,0 +1,248 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from fastapi import HTTPException, Request, status
+
+from src.core.config import get_settings
+from src.core.security import get_hashing_pool
+from src.metrics.registry import Counter, Gauge, Histogram, LabelValues, registry
+
+admission_rejected_total = registry.register(
+    Counter(
+        "admission_rejected_total",
+        "Requests turned away by a concurrency or rate limiter.",
+        ("limiter", "reason"),
+    )
+)
+admission_queue_wait_seconds = registry.register(
+    Histogram(
+        "admission_queue_wait_seconds",
+        "Time requests waited for a concurrency limiter slot.",
+        ("limiter",),
+    )
+)
+
+
+class ServiceOverloadedError(RuntimeError):
+    """Raised when a concurrency limiter sheds a request."""
+
+    def __init__(self, message: str, retry_after: int = 1) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Admits `limit` concurrent holders, and up to `max_queue` waiting ones.
+
+    A request that finds the queue full, or waits longer than
+    `queue_timeout` seconds for a slot, is rejected with
+    ServiceOverloadedError, answered with a 503.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        max_queue: int = 0,
+        queue_timeout: float = 5,
+        retry_after: int = 1,
+    ) -> None:
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    def _reject(self, reason: str) -> ServiceOverloadedError:
+        admission_rejected_total.inc((self.name, reason))
+        return ServiceOverloadedError(
+            f"{self.name} limiter rejected the request: {reason}", self.retry_after
+        )
+
+    async def _acquire(self) -> None:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            return
+
+        if self.waiting >= self.max_queue:
+            raise self._reject("queue_full")
+
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._reject("queue_timeout")
+        finally:
+            self.waiting -= 1
+            admission_queue_wait_seconds.observe(
+                time.perf_counter() - started, (self.name,)
+            )
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self._acquire()
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets refilled at `rate` tokens per second.
+
+    Buckets of the least recently seen clients are dropped beyond
+    `max_clients`, which at worst gives such a client a full bucket again.
+    """
+
+    def __init__(
+        self, name: str, rate: float, burst: int, max_clients: int = 100_000
+    ) -> None:
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        # client -> (tokens, updated at)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    @property
+    def clients(self) -> int:
+        return len(self._buckets)
+
+    def acquire(self, client: str) -> float:
+        """Take a token for `client`, returns 0 or the seconds until one is free."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+            admission_rejected_total.inc((self.name, "rate_limited"))
+
+        self._buckets[client] = (tokens, now)
+        self._buckets.move_to_end(client)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+        return wait
+
+
+_concurrency_limiters: dict[str, ConcurrencyLimiter] = {}
+_rate_limiters: dict[str, TokenBucketLimiter] = {}
+
+
+def _admission_stats() -> Iterable[tuple[LabelValues, float]]:
+    for name, limiter in _concurrency_limiters.items():
+        yield (name, "limit"), limiter.limit
+        yield (name, "active"), limiter.active
+        yield (name, "waiting"), limiter.waiting
+    for name, bucket in _rate_limiters.items():
+        yield (name, "clients"), bucket.clients
+
+
+registry.register(
+    Gauge(
+        "admission",
+        "Concurrency limiter slots and waiting requests, rate limited clients.",
+        ("limiter", "stat"),
+        callback=_admission_stats,
+    )
+)
+
+
+@lru_cache
+def get_hashing_limiter() -> ConcurrencyLimiter:
+    settings = get_settings().limits
+    limiter = ConcurrencyLimiter(
+        "hashing",
+        # enough requests to keep every hashing worker busy
+        limit=settings.hashing_concurrency or 2 * get_hashing_pool().workers,
+        max_queue=settings.hashing_queue,
+        queue_timeout=settings.queue_timeout,
+        retry_after=settings.retry_after,
+    )
+    _concurrency_limiters[limiter.name] = limiter
+    return limiter
+
+
+@lru_cache
+def get_auth_rate_limiter() -> Optional[TokenBucketLimiter]:
+    settings = get_settings().limits
+    if not settings.auth_rate:
+        return None
+
+    limiter = TokenBucketLimiter(
+        "auth",
+        rate=settings.auth_rate,
+        burst=settings.auth_burst,
+        max_clients=settings.max_clients,
+    )
+    _rate_limiters[limiter.name] = limiter
+    return limiter
+
+
+@lru_cache
+def get_availability_rate_limiter() -> Optional[TokenBucketLimiter]:
+    settings = get_settings().limits
+    if not settings.availability_rate:
+        return None
+
+    limiter = TokenBucketLimiter(
+        "availability",
+        rate=settings.availability_rate,
+        burst=settings.availability_burst,
+        max_clients=settings.max_clients,
+    )
+    _rate_limiters[limiter.name] = limiter
+    return limiter
+
+
+def limit_concurrency(
+    get_limiter: Callable[[], ConcurrencyLimiter],
+) -> Callable[[], AsyncIterator[None]]:
+    """Dependency holding a slot of the limiter for the rest of the request.
+
+    Usable on a route, or in a router's `dependencies` for all its routes.
+    """
+
+    async def dependency() -> AsyncIterator[None]:
+        async with get_limiter().slot():
+            yield
+
+    return dependency
+
+
+def rate_limit(
+    get_limiter: Callable[[], Optional[TokenBucketLimiter]],
+) -> Callable[[Request], Awaitable[None]]:
+    """Dependency answering 429 to clients that ran out of tokens."""
+
+    # async, so FastAPI does not run it in the thread pool
+    async def dependency(request: Request) -> None:
+        limiter = get_limiter()
+        if limiter is None:
+            return
+
+        client = request.client.host if request.client else "unknown"
+        wait = limiter.acquire(client)
+        if wait:
+            raise HTTPException(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                "Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    return dependency
@@ -0,0 +1,129 @@
+from functools import cache
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Iterable, Optional, get_args, get_origin
+
+import orjson
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+Converter = Callable[[Any], Any]
+
+# pydantic writes UTC datetimes with a "Z" suffix as well
+DUMPS_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _converter(annotation: Any) -> Optional[Converter]:
+    """Converter for nested schema fields, None when the value is used as is."""
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    if get_origin(annotation) in (list, tuple, set) and args:
+        item = _converter(args[0])
+        if item is None:
+            return None
+        return lambda values: [item(value) for value in values]
+
+    if len(args) == 1:
+        # Optional[...]
+        inner = _converter(args[0])
+        if inner is None:
+            return None
+        return lambda value: None if value is None else inner(value)
+
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return serializer_for(annotation).to_dict
+
+    return None
+
+
+class ModelSerializer:
+    """Renders objects as JSON with the fields of a response schema.
+
+    The field list and nested converters are built once per schema. Values
+    are read from attributes, or keys of a dict, and dumped with orjson
+    without validating them again. A table model can be rendered as its
+    read schema, columns the schema does not declare, like
+    `hashed_password`, are left out.
+    """
+
+    def __init__(self, schema: type[BaseModel]) -> None:
+        self.schema = schema
+        self.fields = tuple(schema.model_fields)
+        self._get_attrs = attrgetter(*self.fields)
+        self._get_items = itemgetter(*self.fields)
+        self._converters = [
+            (index, converter)
+            for index, field in enumerate(schema.model_fields.values())
+            if (converter := _converter(field.annotation)) is not None
+        ]
+
+    def to_dict(self, instance: Any) -> dict[str, Any]:
+        if isinstance(instance, dict):
+            values = self._get_items(instance)
+        else:
+            values = self._get_attrs(instance)
+        if len(self.fields) == 1:
+            values = (values,)
+
+        if self._converters:
+            values = list(values)
+            for index, converter in self._converters:
+                values[index] = converter(values[index])
+
+        return dict(zip(self.fields, values))
+
+    def dumps(self, instance: Any) -> bytes:
+        return orjson.dumps(self.to_dict(instance), option=DUMPS_OPTIONS)
+
+    def dumps_many(self, instances: Iterable[Any]) -> bytes:
+        return orjson.dumps(
+            [self.to_dict(instance) for instance in instances], option=DUMPS_OPTIONS
+        )
+
+    def dumps_lines(self, instances: Iterable[Any]) -> bytes:
+        """Newline-delimited JSON, one object per line."""
+        return b"".join(self.dumps(instance) + b"\n" for instance in instances)
+
+
+@cache
+def serializer_for(schema: type[BaseModel]) -> ModelSerializer:
+    return ModelSerializer(schema)
+
+
+def model_response(
+    schema: type[BaseModel], content: Any, status_code: int = 200
+) -> Response:
+    """Pre-rendered JSON response, FastAPI skips its response model handling.
+
+    Declare `response_model=schema` on the route to keep the OpenAPI schema.
+    """
+    serializer = serializer_for(schema)
+    body = (
+        serializer.dumps_many(content)
+        if isinstance(content, (list, tuple))
+        else serializer.dumps(content)
+    )
+    return Response(body, status_code=status_code, media_type="application/json")
+
+
+def entity_tag(version: int) -> str:
+    return f'"{version}"'
+
+
+def tag_matches(header: str, tag: str, weak: bool = False) -> bool:
+    """Whether an If-Match or If-None-Match header value lists `tag`.
+
+    If-Match compares strongly, weak `W/` tags in it never match;
+    If-None-Match compares with `weak`.
+    """
+    if header.strip() == "*":
+        return True
+
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == tag:
+            return True
+
+    return False
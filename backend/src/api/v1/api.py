@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 
-from src.api.v1.endpoints import auth, test
+from src.api.v1.endpoints import admin, auth, test, users
 
 api_router = APIRouter()
 api_router.include_router(test.router, prefix="/test", tags=["test"])
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
+api_router.include_router(users.router, prefix="/users", tags=["users"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -0,0 +1,107 @@
+from dataclasses import asdict
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from src.api.dependencies import SettingsDep, get_current_admin
+from src.db.query_log import get_query_log
+from src.models.profile import ProfileArm, ProfileDetail, ProfileSummary, ProfileToken
+from src.models.query_log import NPlusOnePattern, QueryFingerprint
+from src.profiling import Profile, get_profile_store, get_profile_trigger
+
+router = APIRouter(dependencies=[Depends(get_current_admin)])
+
+
+def profiling_enabled(settings: SettingsDep) -> None:
+    if not settings.profiling.enabled:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Profiling is disabled")
+
+
+profiles = APIRouter(dependencies=[Depends(profiling_enabled)])
+
+
+def get_profile(id: int) -> Profile:
+    profile = get_profile_store().get(id)
+    if profile is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Profile not found")
+
+    return profile
+
+
+@profiles.get("/")
+async def list_profiles() -> list[ProfileSummary]:
+    """Recent profiles of the worker answering, newest first."""
+    return [
+        ProfileSummary.model_validate(profile, from_attributes=True)
+        for profile in get_profile_store().list()
+    ]
+
+
+@profiles.get("/{id}")
+async def profile_detail(id: int) -> ProfileDetail:
+    profile = get_profile(id)
+    return ProfileDetail.model_validate(
+        {
+            **asdict(profile),
+            "query_count": profile.query_count,
+        }
+    )
+
+
+@profiles.get("/{id}/collapsed", response_class=PlainTextResponse)
+async def profile_collapsed(id: int) -> str:
+    """Collapsed stacks, for flamegraph.pl or speedscope."""
+    return get_profile(id).collapsed()
+
+
+@profiles.post("/token")
+async def profile_token(settings: SettingsDep) -> ProfileToken:
+    """Signed header value that has requests carrying it profiled."""
+    value, expires_at = get_profile_trigger().sign(settings.profiling.token_ttl)
+    return ProfileToken(
+        header=settings.profiling.header, value=value, expires_at=expires_at
+    )
+
+
+@profiles.post("/arm", status_code=status.HTTP_204_NO_CONTENT)
+async def arm_profiler(arm: ProfileArm) -> None:
+    """Profile the next `count` requests under `path_prefix` on this worker."""
+    get_profile_trigger().arm(arm.count, arm.path_prefix)
+
+
+@profiles.delete("/arm", status_code=status.HTTP_204_NO_CONTENT)
+async def disarm_profiler() -> None:
+    get_profile_trigger().arm(0)
+
+
+queries = APIRouter()
+
+
+@queries.get("/")
+async def list_queries(
+    sort: Literal["total_ms", "count", "mean_ms", "max_ms", "slow"] = "total_ms",
+    limit: int = Query(50, ge=1, le=1000),
+) -> list[QueryFingerprint]:
+    """Statements of the worker answering, aggregated by fingerprint."""
+    return [
+        QueryFingerprint.model_validate(stats)
+        for stats in get_query_log().top(sort, limit)
+    ]
+
+
+@queries.get("/n-plus-one")
+async def list_n_plus_one() -> list[NPlusOnePattern]:
+    """Routes that ran one statement more often than the threshold in a request."""
+    return [
+        NPlusOnePattern.model_validate(stats) for stats in get_query_log().n_plus_one()
+    ]
+
+
+@queries.delete("/", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_queries() -> None:
+    get_query_log().reset()
+
+
+router.include_router(profiles, prefix="/profiles")
+router.include_router(queries, prefix="/queries")
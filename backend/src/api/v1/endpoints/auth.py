@@ -1,51 +1,156 @@
-from authlib.integrations.starlette_client import OAuthError
-from fastapi import APIRouter, Request
+import re
+import secrets
+from datetime import datetime
+from typing import Optional
 
-from src.api.dependencies import GoogleOAuthDep, SessionDep
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from pydantic import EmailStr
+
+from src.api.dependencies import CurrentUserDep, GoogleOAuthDep, SessionDep
+from src.api.limits import (
+    get_auth_rate_limiter,
+    get_availability_rate_limiter,
+    get_hashing_limiter,
+    limit_concurrency,
+    rate_limit,
+)
+from src.api.responses import model_response
+from src.auth.availability import NameField, get_availability_index
+from src.auth.tokens import TokenUser, get_access_tokens
+from src.core.security import UNUSABLE_HASH, Hasher
 from src.crud.user import UserCRUD
-from src.models.user import User, UserCreate
+from src.models.token import AccessToken
+from src.models.user import (
+    User,
+    UserAvailability,
+    UserCreate,
+    UserLogin,
+    UsernameStr,
+    UserRead,
+)
+from src.utils.logger import logger
 
 router = APIRouter()
+auth_rate_limit = Depends(rate_limit(get_auth_rate_limiter))
+availability_rate_limit = Depends(rate_limit(get_availability_rate_limiter))
+hashing_slot = Depends(limit_concurrency(get_hashing_limiter))
+
+
+def issue_access_token(user: User) -> AccessToken:
+    tokens = get_access_tokens()
+    return AccessToken(
+        access_token=tokens.issue(user.id, user.username, user.is_admin),
+        expires_in=tokens.ttl,
+    )
+
+
+def username_from_email(email: str) -> str:
+    name = re.sub(r"[^a-zA-Z_\d]", "_", email.split("@")[0])[:24]
+    return f"{name}_{secrets.token_hex(3)}"
+
+
+async def is_taken(crud: UserCRUD, field: NameField, value: str) -> bool:
+    index = get_availability_index()
+    if index is None:
+        return await crud.is_taken(field, value)
+
+    return await index.is_taken(crud, field, value)
+
+
+@router.get("/availability", dependencies=[availability_rate_limit])
+async def availability(
+    session: SessionDep,
+    username: Optional[UsernameStr] = None,
+    email: Optional[EmailStr] = None,
+) -> UserAvailability:
+    """Whether a username and an email can still be registered."""
+    if username is None and email is None:
+        raise HTTPException(
+            status.HTTP_400_BAD_REQUEST, "Pass a username, an email or both"
+        )
+
+    crud = UserCRUD(session)
+    result = UserAvailability()
+    if username is not None:
+        result.username = not await is_taken(crud, "username", username)
+    if email is not None:
+        result.email = not await is_taken(crud, "email", email)
+
+    return result
 
 
-@router.post("/register")
-async def register(user_creation_data: UserCreate, session: SessionDep) -> User:
+@router.post(
+    "/register",
+    response_model=UserRead,
+    dependencies=[auth_rate_limit, hashing_slot],
+)
+async def register(user_creation_data: UserCreate, session: SessionDep) -> Response:
     crud = UserCRUD(session)
+    # checked before the password is hashed, the unique constraints still
+    # decide races between concurrent registrations
+    if await is_taken(crud, "username", user_creation_data.username):
+        raise HTTPException(status.HTTP_409_CONFLICT, "Username is already taken")
+    if await is_taken(crud, "email", user_creation_data.email):
+        raise HTTPException(status.HTTP_409_CONFLICT, "Email is already registered")
+
+    await crud.release_connection()
     user = await crud.create(user_creation_data)
-    return user
+    return model_response(UserRead, user)
+
+
+@router.post("/login", dependencies=[auth_rate_limit, hashing_slot])
+async def login(login_data: UserLogin, session: SessionDep) -> AccessToken:
+    crud = UserCRUD(session)
+    user = await crud.find_by_login(login_data.login)
+    await crud.release_connection()
+    # unknown logins are checked too, answering them faster would reveal them
+    hashed_password = user.hashed_password if user is not None else UNUSABLE_HASH
+    verified = await Hasher.verify_async(
+        login_data.password.get_secret_value(), hashed_password
+    )
+    if user is None or not verified:
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid login or password")
+
+    await crud.update(user, {"last_login": datetime.utcnow()})
 
+    return issue_access_token(user)
 
-# @router.post("/login")
-# async def login(user_creation_data: UserLogin, session: SessionDep) -> User:
-#     crud = UserCRUD(session)
-#     user = await crud.create(user_creation_data)
-#     return user
+
+@router.get("/me", dependencies=[auth_rate_limit])
+async def me(user: CurrentUserDep) -> TokenUser:
+    return user
 
 
-@router.get("/login/google")
+@router.get("/login/google", dependencies=[auth_rate_limit])
 async def login_google(request: Request, oauth: GoogleOAuthDep) -> None:
     redirect_uri = request.url_for("auth_google")
     return await oauth.authorize_redirect(request, redirect_uri)
 
 
-@router.get("/auth/google")
+@router.get("/auth/google", dependencies=[auth_rate_limit])
 async def auth_google(
     request: Request, oauth: GoogleOAuthDep, session: SessionDep
-) -> dict:
-    # provider = "google"
+) -> AccessToken:
+    from authlib.integrations.starlette_client import OAuthError
+
     try:
         token = await oauth.authorize_access_token(request)
-        userinfo = token.get("userinfo")
+    except OAuthError as e:
+        logger.warning(f"Google sign-in failed: {e}")
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Google sign-in failed")
 
-        # service = UserService(session)
-        # if service.is_user_exist_by_account(provider=provider, id=userinfo["sub"]):
-        #     user = service.register_user_with_account(provider=provider, info=userinfo)
-        # else:
-        #     user = service.get_user_with_account_account(provider=provider, id=userinfo["sub"])
+    userinfo = token["userinfo"]
+    if not userinfo.get("email_verified"):
+        # an unverified address must not be linked to an existing account
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Email is not verified")
 
-        # access_token = service.login(user)
-        return {"userinfo": userinfo}
+    crud = UserCRUD(session)
+    user = await crud.find_by_login(userinfo["email"])
+    if user is None:
+        user = await crud.create_external(
+            userinfo["email"], username_from_email(userinfo["email"])
+        )
+    else:
+        await crud.update(user, {"last_login": datetime.utcnow()})
 
-    except OAuthError as e:
-        print(e)
-        return {"error": "Something went wrong"}
+    return issue_access_token(user)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request, Response
 
-from src.api.dependencies import SessionDep, SettingsDep
+from src.api.dependencies import SettingsDep, UnitOfWorkDep
+from src.api.limits import get_hashing_limiter, limit_concurrency
+from src.api.responses import model_response
 from src.crud.user import UserCRUD
-from src.models.user import User, UserCreate, UserUpdate
+from src.models.user import UserCreate, UserRead, UserUpdate
 from src.utils.logger import logger
 
 router = APIRouter()
@@ -25,24 +27,30 @@ async def index(
     return {"ping": "pong!"}
 
 
-@router.post("/create_user")
-async def test_user_create(user_creation_data: UserCreate, session: SessionDep) -> User:
-    logger.debug(user_creation_data.model_dump)
+@router.post(
+    "/create_user",
+    response_model=UserRead,
+    dependencies=[Depends(limit_concurrency(get_hashing_limiter))],
+)
+async def test_user_create(
+    user_creation_data: UserCreate, session: UnitOfWorkDep
+) -> Response:
+    logger.lazy("DEBUG", "{}", user_creation_data.model_dump)
 
     crud = UserCRUD(session)
 
     user = await crud.create(user_creation_data)
-    logger.debug(f"last user id: {user.id}")
+    logger.lazy("DEBUG", "last user id: {}", user.id)
 
     await crud.delete(user.id)
 
     user = await crud.create(user_creation_data)
-    logger.debug(f"new user id: {user.id}")
+    logger.lazy("DEBUG", "new user id: {}", user.id)
 
     changed_data = UserUpdate(username=user.username + "_update")
     user = await crud.update(user, changed_data)
 
     find_user = await crud.find(user.id)
-    logger.debug(f"{find_user = }")
+    logger.lazy("DEBUG", "find_user = {!r}", find_user)
 
-    return user
+    return model_response(UserRead, user)
@@ -0,0 +1,131 @@
+from typing import Annotated, AsyncIterator, Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+
+from src.api.dependencies import (
+    CurrentUserDep,
+    DatabaseDep,
+    SessionDep,
+    get_current_admin,
+)
+from src.api.responses import entity_tag, model_response, serializer_for, tag_matches
+from src.crud.base import VersionConflictError
+from src.crud.user import UserCRUD
+from src.models.user import User, UserPage, UserRead, UserUpdate
+
+router = APIRouter()
+
+
+@router.get("/", response_model=UserPage, dependencies=[Depends(get_current_admin)])
+async def list_users(
+    session: SessionDep,
+    limit: Annotated[int, Query(ge=1, le=500)] = 50,
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    is_admin: Optional[bool] = None,
+) -> Response:
+    filters = {"is_active": is_active, "is_admin": is_admin}
+    filters = {key: value for key, value in filters.items() if value is not None}
+
+    crud = UserCRUD(session)
+    try:
+        users = await crud.find_rows(
+            UserRead.model_fields, limit=limit + 1, after=cursor, **filters
+        )
+    except ValueError as e:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(e))
+
+    next_cursor = crud.encode_cursor(users[limit - 1]) if len(users) > limit else None
+
+    return model_response(
+        UserPage, {"items": users[:limit], "next_cursor": next_cursor}
+    )
+
+
+@router.get("/export", dependencies=[Depends(get_current_admin)])
+async def export_users(db: DatabaseDep) -> StreamingResponse:
+    """Stream every user as NDJSON in constant memory."""
+
+    serializer = serializer_for(UserRead)
+
+    async def lines() -> AsyncIterator[bytes]:
+        async with db.get_read_session() as session:
+            async for users in UserCRUD(session).stream():
+                yield serializer.dumps_lines(users)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def get_user_or_404(crud: UserCRUD, id: UUID) -> User:
+    user = await crud.find(id)
+    if user is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
+
+    return user
+
+
+def user_response(user: User) -> Response:
+    response = model_response(UserRead, user)
+    response.headers["ETag"] = entity_tag(user.version)
+    return response
+
+
+@router.get("/{id}", response_model=UserRead)
+async def get_user(
+    id: UUID,
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    if_none_match: Annotated[Optional[str], Header()] = None,
+) -> Response:
+    """User with an ETag, answered with 304 and no body while it matches.
+
+    Users can read themselves, admins can read anyone.
+    """
+    if current_user.id != id and not current_user.is_admin:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "Not allowed to read this user")
+
+    user = await get_user_or_404(UserCRUD(session), id)
+
+    tag = entity_tag(user.version)
+    if if_none_match is not None and tag_matches(if_none_match, tag, weak=True):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": tag})
+
+    return user_response(user)
+
+
+@router.patch(
+    "/{id}", response_model=UserRead, dependencies=[Depends(get_current_admin)]
+)
+async def update_user(
+    id: UUID,
+    data: UserUpdate,
+    session: SessionDep,
+    if_match: Annotated[Optional[str], Header()] = None,
+) -> Response:
+    """Update a user, only while it still matches the If-Match ETag if one is sent."""
+    crud = UserCRUD(session)
+    user = await get_user_or_404(crud, id)
+
+    tag = entity_tag(user.version)
+    if if_match is not None and not tag_matches(if_match, tag):
+        raise HTTPException(
+            status.HTTP_412_PRECONDITION_FAILED,
+            "User was changed, fetch it again",
+            headers={"ETag": tag},
+        )
+
+    try:
+        user = await crud.update(
+            user, data, expected_version=None if if_match is None else user.version
+        )
+    except VersionConflictError as e:
+        raise HTTPException(
+            status.HTTP_412_PRECONDITION_FAILED
+            if if_match is not None
+            else status.HTTP_409_CONFLICT,
+            str(e),
+        )
+
+    return user_response(user)
@@ -0,0 +1,52 @@
+"""authlib integration, imported when the OAuth registry is first built."""
+from typing import Any
+
+import httpx
+from authlib.integrations.starlette_client import OAuth, StarletteOAuth2App
+
+from src.auth.oidc import get_oidc_cache
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """Sends through a shared transport and leaves it open when a client closes.
+
+    authlib opens and closes an httpx client for every call, so its clients
+    get this wrapper to keep the pooled connections between calls.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self.transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class CachedOAuth2App(StarletteOAuth2App):
+    """OAuth2 app that reads discovery metadata and JWKS from the OIDC cache."""
+
+    async def load_server_metadata(self) -> dict[str, Any]:
+        if self._server_metadata_url:
+            metadata = await get_oidc_cache().get(self._server_metadata_url)
+            self.server_metadata.update(metadata)
+
+        return self.server_metadata
+
+    async def fetch_jwk_set(self, force: bool = False) -> dict[str, Any]:
+        metadata = await self.load_server_metadata()
+        jwk_set = metadata.get("jwks")
+        if jwk_set:
+            return jwk_set
+
+        uri = metadata.get("jwks_uri")
+        if not uri:
+            raise RuntimeError('Missing "jwks_uri" in metadata')
+
+        # authlib forces a refetch when the token is signed by an unknown key
+        return await get_oidc_cache().get(uri, force=force)
+
+
+class CachedOAuth(OAuth):
+    oauth2_client_cls = CachedOAuth2App
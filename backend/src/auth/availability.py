@@ -0,0 +1,210 @@
+import asyncio
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Literal, Optional
+
+from src.core.config import get_settings
+from src.db.session import get_database
+from src.utils.bloom import BloomFilter
+from src.utils.logger import logger
+
+if TYPE_CHECKING:
+    from src.crud.user import UserCRUD
+
+NameField = Literal["username", "email"]
+FIELDS: tuple[NameField, ...] = ("username", "email")
+# seconds before a failed build is retried, or an overfull filter rebuilt
+RETRY_INTERVAL = 60
+
+
+@dataclass
+class AvailabilityStats:
+    checks: int = 0
+    # answered by the filters alone
+    filter_misses: int = 0
+    # filter hits confirmed or refuted by the database
+    database_checks: int = 0
+    false_positives: int = 0
+    rebuilds: int = 0
+    failures: int = 0
+
+
+class AvailabilityIndex:
+    """Bloom filters of taken usernames and emails, in front of the database.
+
+    A name missing from its filter is free and the database is not queried,
+    a name found in it is checked against the database. The filters are
+    built in the background and every check goes to the database until
+    they are ready.
+
+    Names are added as users are created or renamed. Deleted and old names
+    stay in the filters, which only costs a database check, until the next
+    rebuild. Rebuilds happen every `rebuild_interval` seconds, so names
+    registered through other workers are picked up, and when the filters
+    hold more names than they were sized for. Until then such a name is
+    reported free, which is why the index is only used by default when a
+    single worker serves the API.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100_000,
+        error_rate: float = 0.01,
+        rebuild_interval: float = 600,
+        chunk_size: int = 5000,
+    ) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.chunk_size = chunk_size
+        self.stats = AvailabilityStats()
+        self.attempted_at: Optional[float] = None
+        self._filters: Optional[dict[NameField, BloomFilter]] = None
+        # filters being built, names added meanwhile go to both
+        self._building: Optional[dict[NameField, BloomFilter]] = None
+        self._rebuild: Optional[asyncio.Task[None]] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filters is not None
+
+    def _new_filters(self, capacity: int) -> dict[NameField, BloomFilter]:
+        return {field: BloomFilter(capacity, self.error_rate) for field in FIELDS}
+
+    def add(self, username: Optional[str] = None, email: Optional[str] = None) -> None:
+        for filters in (self._filters, self._building):
+            if filters is None:
+                continue
+            if username is not None:
+                filters["username"].add(username)
+            if email is not None:
+                filters["email"].add(email)
+
+    def might_be_taken(self, field: NameField, value: str) -> bool:
+        if self._filters is None:
+            return True
+
+        return value in self._filters[field]
+
+    async def is_taken(self, crud: "UserCRUD", field: NameField, value: str) -> bool:
+        self.stats.checks += 1
+        self._maybe_rebuild()
+        if not self.might_be_taken(field, value):
+            self.stats.filter_misses += 1
+            return False
+
+        self.stats.database_checks += 1
+        taken = await crud.is_taken(field, value)
+        if not taken and self.ready:
+            self.stats.false_positives += 1
+
+        return taken
+
+    async def build(self) -> None:
+        """Fill new filters from the database, streaming the names in chunks."""
+        from src.crud.user import UserCRUD
+
+        started = time.perf_counter()
+        capacity = self.capacity
+        if self._filters is not None:
+            capacity = max(capacity, self._filters["username"].count * 2)
+
+        self._building = building = self._new_filters(capacity)
+        try:
+            async with get_database().get_read_session() as session:
+                async for rows in UserCRUD(session).stream_names(self.chunk_size):
+                    for username, email in rows:
+                        building["username"].add(username)
+                        building["email"].add(email)
+        finally:
+            self._building = None
+
+        self._filters = building
+        self.stats.rebuilds += 1
+        logger.info(
+            f"availability filters built with {building['username'].count} users "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+
+    async def build_safely(self) -> None:
+        try:
+            await self.build()
+        except Exception as e:
+            self.stats.failures += 1
+            logger.warning(f"availability filters build failed: {e!r}")
+
+    def start(self) -> None:
+        """Build the filters in a background task."""
+        if self._rebuild is not None:
+            return
+
+        self.attempted_at = time.monotonic()
+        self._rebuild = asyncio.create_task(self.build_safely())
+        self._rebuild.add_done_callback(self._rebuild_done)
+
+    def _rebuild_done(self, task: "asyncio.Task[None]") -> None:
+        self._rebuild = None
+
+    def _maybe_rebuild(self) -> None:
+        if self._rebuild is not None or self.attempted_at is None:
+            return
+
+        elapsed = time.monotonic() - self.attempted_at
+        if self._filters is None:
+            due = elapsed > RETRY_INTERVAL
+        else:
+            usernames = self._filters["username"]
+            overfull = usernames.count > usernames.capacity
+            due = elapsed > self.rebuild_interval or (
+                overfull and elapsed > RETRY_INTERVAL
+            )
+
+        if due:
+            self.start()
+
+    async def close(self) -> None:
+        if self._rebuild is not None:
+            self._rebuild.cancel()
+
+    def get_stats(self) -> dict[str, int]:
+        stats = asdict(self.stats)
+        if self._filters is not None:
+            stats["names"] = self._filters["username"].count
+            stats["memory_bytes"] = sum(
+                bloom.memory for bloom in self._filters.values()
+            )
+
+        return stats
+
+
+@lru_cache
+def get_availability_index() -> Optional[AvailabilityIndex]:
+    core = get_settings().core
+    settings = get_settings().auth.availability
+    enabled = settings.enabled
+    if enabled is None:
+        # names registered by other workers would be missing from the filters
+        enabled = core.workers == 1
+    if not enabled:
+        return None
+
+    return AvailabilityIndex(
+        capacity=settings.capacity,
+        error_rate=settings.error_rate,
+        rebuild_interval=settings.rebuild_interval,
+        chunk_size=settings.chunk_size,
+    )
+
+
+async def start_availability_index() -> None:
+    index = get_availability_index()
+    if index is not None:
+        index.start()
+
+
+async def close_availability_index() -> None:
+    index = get_availability_index()
+    if index is not None:
+        await index.close()
+    get_availability_index.cache_clear()
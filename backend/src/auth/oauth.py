@@ -1,29 +1,39 @@
 from functools import lru_cache
-from typing import Callable
-
-from authlib.integrations.starlette_client import OAuth
-from authlib.integrations.starlette_client.apps import StarletteOAuth2App
+from typing import TYPE_CHECKING, Any, Callable
 
 from src.core.config import get_settings
 
+if TYPE_CHECKING:
+    from authlib.integrations.starlette_client import OAuth
+    from authlib.integrations.starlette_client.apps import StarletteOAuth2App
+
 
+# authlib pulls in httpx and its integrations, so it is imported on first use
+# instead of at application import time.
 @lru_cache
-def get_oauth() -> OAuth:
+def get_oauth() -> "OAuth":
+    from src.auth.apps import CachedOAuth, SharedTransport
+    from src.core.http import get_http_transport
+
     settings = get_settings()
-    oauth = OAuth()
+    oauth = CachedOAuth()
     oauth.register(
         name="google",
         client_id=settings.auth.google.client_id,
         client_secret=settings.auth.google.client_secret,
-        server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-        client_kwargs={"scope": "openid email profile"},
+        server_metadata_url=settings.auth.oidc.google_metadata_url,
+        client_kwargs={
+            "scope": "openid email profile",
+            "transport": SharedTransport(get_http_transport()),
+            "timeout": settings.http.timeout,
+        },
     )
 
     return oauth
 
 
-def create_client_dep(client_name: str) -> Callable[[], StarletteOAuth2App]:
-    def create_client() -> StarletteOAuth2App:
+def create_client_dep(client_name: str) -> Callable[[], "StarletteOAuth2App"]:
+    def create_client() -> Any:
         oauth = get_oauth()
         client = oauth.create_client(client_name)
 
@@ -0,0 +1,141 @@
+import asyncio
+import re
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+from src.core.config import get_settings
+from src.core.http import get_http_client
+from src.utils.logger import logger
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+@dataclass
+class CachedDocument:
+    value: dict[str, Any]
+    fetched_at: float
+    refresh_at: float
+    expires_at: float
+
+
+@dataclass
+class OIDCCacheStats:
+    hits: int = 0
+    misses: int = 0
+    fetches: int = 0
+    refreshes: int = 0
+    failures: int = 0
+
+
+class OIDCDocumentCache:
+    """Discovery documents and JWK sets kept in process by URL.
+
+    Documents close to expiry are served while a background task refreshes
+    them, and concurrent misses for one URL share a single fetch. An expired
+    document is still served when the provider cannot be reached.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600,
+        refresh_margin: float = 300,
+        force_refresh_interval: float = 10,
+    ) -> None:
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.force_refresh_interval = force_refresh_interval
+        self.stats = OIDCCacheStats()
+        self._documents: dict[str, CachedDocument] = {}
+        self._fetches: dict[str, asyncio.Task[dict[str, Any]]] = {}
+
+    async def get(self, url: str, force: bool = False) -> dict[str, Any]:
+        """Document at `url`, `force` refetches it unless that was just done."""
+        document = self._documents.get(url)
+        now = time.monotonic()
+
+        if document is None:
+            self.stats.misses += 1
+            return await self._fetch(url)
+
+        if force and now - document.fetched_at >= self.force_refresh_interval:
+            self.stats.misses += 1
+            return await self._fetch(url)
+
+        if now >= document.expires_at:
+            self.stats.misses += 1
+            try:
+                return await self._fetch(url)
+            except Exception:
+                return document.value
+
+        self.stats.hits += 1
+        if now >= document.refresh_at and url not in self._fetches:
+            self.stats.refreshes += 1
+            self._start_fetch(url)
+
+        return document.value
+
+    def _start_fetch(self, url: str) -> "asyncio.Task[dict[str, Any]]":
+        task = self._fetches.get(url)
+        if task is None:
+            task = asyncio.create_task(self._load(url))
+            task.add_done_callback(lambda task: self._fetch_done(url, task))
+            self._fetches[url] = task
+
+        return task
+
+    async def _fetch(self, url: str) -> dict[str, Any]:
+        # shielded, so a cancelled request does not cancel the fetch others await
+        return await asyncio.shield(self._start_fetch(url))
+
+    def _fetch_done(self, url: str, task: "asyncio.Task[dict[str, Any]]") -> None:
+        self._fetches.pop(url, None)
+        if task.cancelled():
+            return
+
+        error = task.exception()
+        if error is not None:
+            self.stats.failures += 1
+            logger.warning(f"OIDC document fetch failed for {url}: {error!r}")
+
+    async def _load(self, url: str) -> dict[str, Any]:
+        response = await get_http_client().get(url)
+        response.raise_for_status()
+        value = response.json()
+        self.stats.fetches += 1
+
+        now = time.monotonic()
+        ttl = self._ttl_for(response.headers.get("cache-control"))
+        self._documents[url] = CachedDocument(
+            value=value,
+            fetched_at=now,
+            # short-lived documents refresh halfway through their lifetime
+            refresh_at=now + ttl - min(self.refresh_margin, ttl / 2),
+            expires_at=now + ttl,
+        )
+        return value
+
+    def _ttl_for(self, cache_control: Optional[str]) -> float:
+        match = MAX_AGE_RE.search(cache_control or "")
+        if match is None:
+            return self.ttl
+
+        return float(match.group(1))
+
+    def clear(self) -> None:
+        self._documents.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        return asdict(self.stats)
+
+
+@lru_cache
+def get_oidc_cache() -> OIDCDocumentCache:
+    settings = get_settings().auth.oidc
+    return OIDCDocumentCache(
+        ttl=settings.ttl,
+        refresh_margin=settings.refresh_margin,
+        force_refresh_interval=settings.force_refresh_interval,
+    )
@@ -0,0 +1,194 @@
+import json
+import secrets
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.cache.backends import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from src.core.config import get_settings
+from src.utils.logger import logger
+
+
+class PathScopedMiddleware:
+    """Runs `middleware` only for requests under `prefix`, others skip it."""
+
+    def __init__(
+        self, app: ASGIApp, prefix: str, middleware: type, **options: Any
+    ) -> None:
+        self.app = app
+        self.prefix = prefix.rstrip("/")
+        self.scoped = middleware(app, **options)
+
+    def matches(self, scope: Scope) -> bool:
+        path = scope["path"]
+        return path == self.prefix or path.startswith(self.prefix + "/")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] in ("http", "websocket") and self.matches(scope):
+            await self.scoped(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+
+class ServerSessionMiddleware:
+    """Keeps `request.session` in a cache backend under a random id.
+
+    The cookie only carries the id, it is set when a session is created and
+    cleared when the session is emptied. The session is written back only
+    when its content changed.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: CacheBackend,
+        session_cookie: str = "session",
+        max_age: int = 14 * 24 * 60 * 60,
+        path: str = "/",
+        https_only: bool = False,
+    ) -> None:
+        self.app = app
+        self.store = store
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.path = path
+        self.security_flags = "httponly; samesite=lax"
+        if https_only:
+            self.security_flags += "; secure"
+
+    @staticmethod
+    def key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    async def load(self, session_id: Optional[str]) -> Optional[bytes]:
+        if not session_id:
+            return None
+
+        try:
+            return await self.store.get(self.key(session_id))
+        except Exception as e:
+            logger.warning(f"session load failed: {e!r}")
+            return None
+
+    async def save(
+        self,
+        session: dict[str, Any],
+        session_id: Optional[str],
+        loaded: Optional[bytes],
+    ) -> Optional[str]:
+        """Persist a changed session, returns the cookie value to set if any."""
+        if not session:
+            if session_id is None or loaded is None:
+                return None
+
+            await self.store.delete(self.key(session_id))
+            return ""
+
+        data = json.dumps(session).encode()
+        if data == loaded:
+            return None
+
+        # ids the store does not know are never reused, so a client cannot
+        # choose its own session id
+        cookie = None
+        if session_id is None or loaded is None:
+            session_id = cookie = secrets.token_urlsafe(32)
+
+        await self.store.set(self.key(session_id), data, self.max_age)
+        return cookie
+
+    def cookie(self, value: str) -> str:
+        if not value:
+            return (
+                f"{self.session_cookie}=null; path={self.path}; "
+                f"expires=Thu, 01 Jan 1970 00:00:00 GMT; {self.security_flags}"
+            )
+
+        return (
+            f"{self.session_cookie}={value}; path={self.path}; "
+            f"Max-Age={self.max_age}; {self.security_flags}"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        session_id = HTTPConnection(scope).cookies.get(self.session_cookie)
+        loaded = await self.load(session_id)
+        scope["session"] = json.loads(loaded) if loaded else {}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                try:
+                    cookie = await self.save(scope["session"], session_id, loaded)
+                except Exception as e:
+                    logger.warning(f"session save failed: {e!r}")
+                    cookie = None
+
+                if cookie is not None:
+                    MutableHeaders(scope=message).append(
+                        "Set-Cookie", self.cookie(cookie)
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+@lru_cache
+def get_session_store() -> Optional[CacheBackend]:
+    settings = get_settings().session
+    match settings.backend:
+        case "memory":
+            return MemoryCacheBackend(max_size=settings.max_size)
+        case "redis":
+            return RedisCacheBackend(settings.redis_url, timeout=settings.timeout)
+        case _:
+            return None
+
+
+async def close_session_store() -> None:
+    store = get_session_store()
+    if store is not None:
+        await store.close()
+    get_session_store.cache_clear()
+
+
+def setup_sessions(app: FastAPI, path: str) -> None:
+    """Install session handling for requests under `path` only.
+
+    Only the OAuth flow needs `request.session`, other routes do not pay for
+    reading and signing the cookie, and browsers only send it under `path`.
+    """
+    settings = get_settings()
+    options: dict[str, Any] = {
+        "session_cookie": settings.session.cookie_name,
+        "max_age": settings.session.max_age,
+        "path": path,
+        "https_only": settings.session.https_only,
+    }
+
+    store = get_session_store()
+    if store is None:
+        app.add_middleware(
+            PathScopedMiddleware,
+            prefix=path,
+            middleware=SessionMiddleware,
+            secret_key=settings.core.secret_key,
+            **options,
+        )
+    else:
+        app.add_middleware(
+            PathScopedMiddleware,
+            prefix=path,
+            middleware=ServerSessionMiddleware,
+            store=store,
+            **options,
+        )
+
+    app.add_event_handler("shutdown", close_session_store)
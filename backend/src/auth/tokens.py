@@ -0,0 +1,172 @@
+import hashlib
+import hmac
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+from uuid import UUID
+
+from src.core.config import get_settings
+
+DEFAULT_KEY_ID = "default"
+
+
+class TokenError(Exception):
+    """Raised when an access token is malformed, expired or not signed by us."""
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    """User as described by a verified access token, without a database hit."""
+
+    id: UUID
+    username: str
+    is_admin: bool
+    expires_at: int
+
+
+class VerifiedTokenCache:
+    """LRU of verified tokens keyed by token hash, entries leave at token expiry."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._users: OrderedDict[bytes, TokenUser] = OrderedDict()
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[TokenUser]:
+        user = self._users.get(key)
+        if user is None:
+            return None
+
+        if user.expires_at <= time.time():
+            del self._users[key]
+            return None
+
+        self._users.move_to_end(key)
+        return user
+
+    def set(self, key: bytes, user: TokenUser) -> None:
+        if not self.max_size:
+            return
+
+        self._users[key] = user
+        self._users.move_to_end(key)
+        while len(self._users) > self.max_size:
+            self._users.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+class AccessTokens:
+    """Issues and verifies HMAC-signed JWT access tokens.
+
+    Tokens carry the id of the key that signed them in the `kid` header and
+    are verified with any key of the ring, so a new key can be made active
+    while tokens signed by the previous one are still accepted.
+    """
+
+    def __init__(
+        self,
+        keys: dict[str, str],
+        active_key_id: str,
+        algorithm: str = "HS256",
+        ttl: int = 900,
+        issuer: Optional[str] = None,
+        cache_size: int = 10_000,
+    ) -> None:
+        if active_key_id not in keys:
+            raise ValueError(f"active key {active_key_id!r} is not in the key ring")
+
+        self.keys = keys
+        self.active_key_id = active_key_id
+        self.algorithm = algorithm
+        self.ttl = ttl
+        self.issuer = issuer
+        self.cache = VerifiedTokenCache(cache_size)
+
+    def issue(self, id: UUID, username: str, is_admin: bool = False) -> str:
+        # pyjwt loads the cryptography backends, so it is imported on first use
+        import jwt
+
+        now = int(time.time())
+        claims: dict[str, Any] = {
+            "sub": str(id),
+            "username": username,
+            "admin": is_admin,
+            "iat": now,
+            "exp": now + self.ttl,
+        }
+        if self.issuer is not None:
+            claims["iss"] = self.issuer
+
+        return jwt.encode(
+            claims,
+            self.keys[self.active_key_id],
+            algorithm=self.algorithm,
+            headers={"kid": self.active_key_id},
+        )
+
+    def verify(self, token: str) -> TokenUser:
+        key = self.cache.key(token)
+        user = self.cache.get(key)
+        if user is not None:
+            return user
+
+        user = self._decode(token)
+        self.cache.set(key, user)
+
+        return user
+
+    def _decode(self, token: str) -> TokenUser:
+        import jwt
+
+        try:
+            key_id = jwt.get_unverified_header(token).get("kid")
+            secret = self.keys.get(key_id)  # type: ignore[arg-type]
+            if secret is None:
+                raise TokenError("token is signed by an unknown key")
+
+            claims = jwt.decode(
+                token,
+                secret,
+                algorithms=[self.algorithm],
+                issuer=self.issuer,
+                options={"require": ["sub", "exp", "iat"]},
+            )
+            return TokenUser(
+                id=UUID(claims["sub"]),
+                username=claims.get("username", ""),
+                is_admin=bool(claims.get("admin", False)),
+                expires_at=claims["exp"],
+            )
+        except jwt.PyJWTError as e:
+            raise TokenError(str(e)) from e
+        except ValueError as e:
+            raise TokenError("token subject is not a user id") from e
+
+
+@lru_cache
+def get_access_tokens() -> AccessTokens:
+    settings = get_settings()
+    jwt_settings = settings.auth.jwt
+
+    keys = dict(jwt_settings.keys)
+    if not keys:
+        # a separate key from the session cookie secret, derived from it
+        keys[DEFAULT_KEY_ID] = hmac.new(
+            settings.core.secret_key.encode(), b"jwt", hashlib.sha256
+        ).hexdigest()
+
+    return AccessTokens(
+        keys=keys,
+        active_key_id=jwt_settings.active_key_id or next(iter(keys)),
+        algorithm=jwt_settings.algorithm,
+        ttl=jwt_settings.access_token_ttl,
+        issuer=jwt_settings.issuer,
+        cache_size=jwt_settings.cache_size,
+    )
@@ -0,0 +1,2 @@
+from src.cache.backends import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from src.cache.entity import EntityCache, get_entity_cache
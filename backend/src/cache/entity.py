@@ -0,0 +1,145 @@
+import json
+import time
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Optional, Type, TypeVar
+
+from sqlmodel import SQLModel
+
+from src.cache.backends import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from src.core.config import get_settings
+from src.utils.logger import logger
+
+ModelType = TypeVar("ModelType", bound=SQLModel)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    invalidations: int = 0
+    # rows not cached because their key was invalidated while they were read
+    stale: int = 0
+    errors: int = 0
+
+
+class EntityCache:
+    """Read-through cache of model rows keyed by model and primary key.
+
+    Backend failures are logged and treated as misses, so the database
+    stays the source of truth.
+
+    A row is only cached when its key was not invalidated since the read
+    started, or since `replica_lag` seconds before it for reads from a
+    replica; otherwise an old row could be cached for the whole TTL. The
+    invalidation times are kept per process, a shared backend is still
+    exposed to this race between processes. Past `max_tracked` keys the
+    times are dropped and reads in flight are not cached.
+    """
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl: float = 60,
+        replica_lag: float = 0,
+        max_tracked: int = 10_000,
+    ) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.replica_lag = replica_lag
+        self.max_tracked = max_tracked
+        self.stats = CacheStats()
+        # key -> monotonic time of its last invalidation
+        self._invalidated_at: dict[str, float] = {}
+        # invalidations before this time are no longer tracked
+        self._tracked_since = float("-inf")
+
+    @staticmethod
+    def key(model: Type[SQLModel], id: Any) -> str:
+        return f"entity:{model.__tablename__}:{id}"
+
+    async def get(self, model: Type[ModelType], id: Any) -> Optional[ModelType]:
+        try:
+            raw = await self.backend.get(self.key(model, id))
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"entity cache get failed: {e!r}")
+            raw = None
+
+        if raw is None:
+            self.stats.misses += 1
+            return None
+
+        self.stats.hits += 1
+        return model.model_validate(json.loads(raw))
+
+    def _invalidated_since(self, key: str, since: float) -> bool:
+        # keys invalidated before the last clear are only known to be older
+        return self._invalidated_at.get(key, self._tracked_since) >= since
+
+    async def set(
+        self,
+        instance: SQLModel,
+        read_at: Optional[float] = None,
+        from_replica: bool = False,
+    ) -> None:
+        """Cache `instance`, read from the database at monotonic `read_at`."""
+        key = self.key(type(instance), instance.id)  # type: ignore
+        if read_at is not None:
+            if from_replica:
+                read_at -= self.replica_lag
+            if self._invalidated_since(key, read_at):
+                self.stats.stale += 1
+                return
+
+        try:
+            await self.backend.set(key, instance.model_dump_json().encode(), self.ttl)
+            self.stats.sets += 1
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"entity cache set failed: {e!r}")
+
+    async def invalidate(self, model: Type[SQLModel], *ids: Any) -> None:
+        if not ids:
+            return
+
+        now = time.monotonic()
+        if len(self._invalidated_at) + len(ids) > self.max_tracked:
+            self._invalidated_at.clear()
+            self._tracked_since = now
+        for id in ids:
+            self._invalidated_at[self.key(model, id)] = now
+
+        try:
+            await self.backend.delete(*(self.key(model, id) for id in ids))
+            self.stats.invalidations += len(ids)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"entity cache invalidation failed: {e!r}")
+
+    def get_stats(self) -> dict[str, int]:
+        return asdict(self.stats)
+
+
+@lru_cache
+def get_entity_cache() -> Optional[EntityCache]:
+    settings = get_settings().cache
+
+    backend: CacheBackend
+    match settings.backend:
+        case "memory":
+            backend = MemoryCacheBackend(max_size=settings.max_size)
+        case "redis":
+            backend = RedisCacheBackend(settings.redis_url, timeout=settings.timeout)
+        case _:
+            return None
+
+    return EntityCache(backend, ttl=settings.ttl, replica_lag=settings.replica_lag)
+
+
+async def close_entity_cache() -> None:
+    cache = get_entity_cache()
+    if cache is not None:
+        await cache.backend.close()
+    get_entity_cache.cache_clear()
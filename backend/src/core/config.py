@@ -1,7 +1,7 @@
 import secrets
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Literal, Optional
 
 from envparse import Env
 from pydantic import (
@@ -16,6 +16,28 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 PROJECT_FOLDER = Path(__file__).parent.parent.parent
 
 
+class PostgresPoolSettings(BaseSettings):
+    size: int = 5
+    max_overflow: int = 10
+    timeout: float = 30
+    recycle: int = -1
+    pre_ping: bool = False
+    # asyncpg prepared statement cache, must be 0 behind PgBouncer
+    statement_cache_size: int = 100
+    # connections opened at startup so first requests skip the connect cost
+    warmup: int = 0
+
+    model_config = SettingsConfigDict(env_prefix="postgres_pool_", extra="ignore")
+
+
+class PostgresReplicaSettings(BaseSettings):
+    uris: list[PostgresDsn] = []
+    # seconds an unreachable replica is skipped before it is tried again
+    cooldown: float = 30
+
+    model_config = SettingsConfigDict(env_prefix="postgres_replicas_", extra="ignore")
+
+
 class PostgresSettings(BaseModel):
     driver: str
     host: str
@@ -25,6 +47,8 @@ class PostgresSettings(BaseModel):
     db: str
 
     uri: Optional[PostgresDsn] = Field(None, validate_default=True)
+    pool: PostgresPoolSettings = Field(default_factory=PostgresPoolSettings)
+    replicas: PostgresReplicaSettings = Field(default_factory=PostgresReplicaSettings)
 
     @field_validator("uri", mode="before")
     @classmethod
@@ -58,8 +82,59 @@ class AuthProviderSettings(BaseModel):
         return self.client.secret
 
 
+class JWTSettings(BaseSettings):
+    algorithm: Literal["HS256", "HS384", "HS512"] = "HS256"
+    # key id -> secret; new tokens are signed with `active_key_id` and any
+    # key still listed verifies, so keys can be rotated without logouts.
+    # Defaults to a single key derived from the core secret key.
+    keys: dict[str, str] = {}
+    active_key_id: Optional[str] = None
+    access_token_ttl: int = 900
+    issuer: Optional[str] = None
+    # verified tokens kept in memory so repeated requests skip the signature check
+    cache_size: int = 10_000
+
+    model_config = SettingsConfigDict(env_prefix="auth_jwt_", extra="ignore")
+
+
+class OIDCSettings(BaseSettings):
+    google_metadata_url: str = (
+        "https://accounts.google.com/.well-known/openid-configuration"
+    )
+    # seconds discovery documents and JWKS are kept when the provider
+    # response has no Cache-Control max-age
+    ttl: float = 3600
+    # refresh in the background once a document is this close to expiring
+    refresh_margin: float = 300
+    # minimum seconds between JWKS refetches caused by an unknown key id
+    force_refresh_interval: float = 10
+
+    model_config = SettingsConfigDict(env_prefix="auth_oidc_", extra="ignore")
+
+
+class AvailabilitySettings(BaseSettings):
+    # Bloom filters of taken usernames and emails, built at startup. Each
+    # process has its own, and a name registered by another process is only
+    # added at the next rebuild, until then it would be reported available.
+    # None enables them only when the server runs a single worker; with
+    # several instances on one database set it to false
+    enabled: Optional[bool] = None
+    # names the filters are sized for, they are rebuilt larger when exceeded
+    capacity: int = 100_000
+    error_rate: float = 0.01
+    # seconds between rebuilds, which pick up names registered by other
+    # workers and drop renamed or deleted ones
+    rebuild_interval: float = 600
+    chunk_size: int = 5000
+
+    model_config = SettingsConfigDict(env_prefix="auth_availability_", extra="ignore")
+
+
 class AuthSettings(BaseModel):
     google: AuthProviderSettings
+    oidc: OIDCSettings = Field(default_factory=OIDCSettings)
+    jwt: JWTSettings = Field(default_factory=JWTSettings)
+    availability: AvailabilitySettings = Field(default_factory=AvailabilitySettings)
 
 
 class CoreSettings(BaseSettings):
@@ -69,9 +144,178 @@ class CoreSettings(BaseSettings):
     secret_key: str = secrets.token_urlsafe(32)
     debug: bool = False
 
+    # server, debug runs a single reloading process instead of workers
+    host: str = "127.0.0.1"
+    port: int = 8000
+    # worker processes, 0 for one per CPU available to the process. Each
+    # worker keeps its own metrics, profiles and query log, so /metrics and
+    # the /admin endpoints only report the worker that answers the request
+    workers: int = 1
+    backlog: int = 2048
+    keep_alive: int = 5
+    # connections and tasks per worker over which requests get a 503
+    limit_concurrency: Optional[int] = None
+    # requests after which a worker is replaced, unlimited when unset
+    max_requests: Optional[int] = None
+    # seconds a stopping worker gets to finish in-flight requests
+    graceful_timeout: int = 30
+    # "auto" uses uvloop and httptools when they are installed
+    event_loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http_protocol: Literal["auto", "h11", "httptools"] = "auto"
+    proxy_headers: bool = True
+    forwarded_allow_ips: Optional[str] = None
+
+
+class HasherSettings(BaseSettings):
+    # "inline" hashes on the event loop, as before the worker pool existed.
+    executor: Literal["thread", "process", "inline"] = "thread"
+    workers: Optional[int] = None
+    max_queue: int = 64
+
+    model_config = SettingsConfigDict(env_prefix="hasher_", extra="ignore")
+
+
+class LimitSettings(BaseSettings):
+    # concurrent requests doing password hashing, defaults to twice the
+    # hashing workers; more wait in a queue of `hashing_queue`
+    hashing_concurrency: Optional[int] = None
+    hashing_queue: int = 100
+    # seconds a request waits for a slot before it gets a 503
+    queue_timeout: float = 5
+    # seconds sent in Retry-After with the 503 of an overloaded server
+    retry_after: int = 1
+    # requests per second and burst per client on the auth routes, 0 disables
+    auth_rate: float = 5
+    auth_burst: int = 20
+    # the same for the availability check, which signup forms may call on
+    # every keystroke; it has its own buckets so it cannot use up logins'
+    availability_rate: float = 10
+    availability_burst: int = 50
+    # clients whose buckets are kept
+    max_clients: int = 100_000
+
+    model_config = SettingsConfigDict(env_prefix="limits_", extra="ignore")
+
+
+class CacheSettings(BaseSettings):
+    backend: Literal["none", "memory", "redis"] = "none"
+    # entries kept by the in-process backend
+    max_size: int = 10_000
+    ttl: float = 60
+    # seconds a replica may lag behind the primary, rows read from a replica
+    # are not cached when their key was invalidated within this window
+    replica_lag: float = 5
+    redis_url: str = "redis://localhost:6379/0"
+    timeout: float = 1.0
+
+    model_config = SettingsConfigDict(env_prefix="cache_", extra="ignore")
+
+
+class SessionSettings(BaseSettings):
+    # "cookie" keeps the session in a signed cookie, the others keep it on
+    # the server and the cookie only carries a random session id
+    backend: Literal["cookie", "memory", "redis"] = "cookie"
+    cookie_name: str = "session"
+    max_age: int = 14 * 24 * 60 * 60
+    https_only: bool = False
+    # sessions kept by the in-process backend
+    max_size: int = 10_000
+    redis_url: str = "redis://localhost:6379/0"
+    timeout: float = 1.0
+
+    model_config = SettingsConfigDict(env_prefix="session_", extra="ignore")
+
+
+class WriteBehindSettings(BaseSettings):
+    # hot columns (see CRUDBase.write_behind_fields) are written in bulk
+    # instead of with one UPDATE per change
+    enabled: bool = True
+    # seconds between flushes
+    interval: float = 5
+    # rows waiting that trigger an early flush
+    max_pending: int = 1000
+    chunk_size: int = 1000
+
+    model_config = SettingsConfigDict(env_prefix="write_behind_", extra="ignore")
+
+
+class LoggingSettings(BaseSettings):
+    # None logs at INFO, or at DEBUG when core.debug is set. DEBUG makes the
+    # lazy debug records render their messages on every call
+    level: Optional[str] = None
+    # write records from a background thread instead of the event loop
+    background: bool = True
+    queue_size: int = 10_000
+    batch_size: int = 256
+    # what to do with new records when the queue is full
+    overflow: Literal["drop_new", "drop_old", "block"] = "drop_new"
+    # share of lazy debug records that are emitted
+    debug_sample_rate: float = 1.0
+
+    model_config = SettingsConfigDict(env_prefix="log_", extra="ignore")
+
+
+class HttpClientSettings(BaseSettings):
+    timeout: float = 10
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30
+    # connect retries, requests themselves are not retried
+    retries: int = 1
+
+    model_config = SettingsConfigDict(env_prefix="http_", extra="ignore")
+
+
+class ProfilingSettings(BaseSettings):
+    # off, no middleware is installed and requests pay nothing
+    enabled: bool = False
+    # header carrying a signed value from POST /admin/profiles/token
+    header: str = "X-Profile"
+    # seconds a signed header value stays valid
+    token_ttl: int = 600
+    # seconds between stack samples
+    interval: float = 0.001
+    # seconds after which a long request is no longer sampled
+    max_duration: float = 30
+    # profiles kept per worker
+    max_profiles: int = 50
+    # SQL statements recorded per profile
+    max_queries: int = 500
+
+    model_config = SettingsConfigDict(env_prefix="profiling_", extra="ignore")
+
+
+class QueryLogSettings(BaseSettings):
+    enabled: bool = True
+    # statements taking longer are logged with their parameter types
+    slow_ms: float = 100
+    # executions of one statement in a request above which it is an N+1
+    n_plus_one_threshold: int = 10
+    # distinct statements aggregated per worker
+    max_fingerprints: int = 1000
+
+    model_config = SettingsConfigDict(env_prefix="query_log_", extra="ignore")
+
+
+class MetricsSettings(BaseSettings):
+    enabled: bool = True
+    path: str = "/metrics"
+
+    model_config = SettingsConfigDict(env_prefix="metrics_", extra="ignore")
+
 
 class Settings(BaseSettings):
     core: CoreSettings = Field(default_factory=CoreSettings)
+    hasher: HasherSettings = Field(default_factory=HasherSettings)
+    limits: LimitSettings = Field(default_factory=LimitSettings)
+    cache: CacheSettings = Field(default_factory=CacheSettings)
+    session: SessionSettings = Field(default_factory=SessionSettings)
+    write_behind: WriteBehindSettings = Field(default_factory=WriteBehindSettings)
+    logging: LoggingSettings = Field(default_factory=LoggingSettings)
+    metrics: MetricsSettings = Field(default_factory=MetricsSettings)
+    profiling: ProfilingSettings = Field(default_factory=ProfilingSettings)
+    query_log: QueryLogSettings = Field(default_factory=QueryLogSettings)
+    http: HttpClientSettings = Field(default_factory=HttpClientSettings)
     postgres: PostgresSettings
     auth: AuthSettings
 
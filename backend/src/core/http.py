@@ -0,0 +1,45 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+from src.core.config import get_settings
+
+if TYPE_CHECKING:
+    import httpx
+
+
+# httpx takes a few hundred milliseconds to import, so it is loaded with the
+# first outbound request, like authlib.
+@lru_cache
+def get_http_transport() -> "httpx.AsyncHTTPTransport":
+    """Connection pool shared by every outbound HTTP client of the process."""
+    import httpx
+
+    settings = get_settings().http
+    return httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=settings.max_connections,
+            max_keepalive_connections=settings.max_keepalive_connections,
+            keepalive_expiry=settings.keepalive_expiry,
+        ),
+        retries=settings.retries,
+    )
+
+
+@lru_cache
+def get_http_client() -> "httpx.AsyncClient":
+    import httpx
+
+    return httpx.AsyncClient(
+        transport=get_http_transport(),
+        timeout=get_settings().http.timeout,
+    )
+
+
+async def close_http_client() -> None:
+    if get_http_client.cache_info().currsize:
+        await get_http_client().aclose()
+    elif get_http_transport.cache_info().currsize:
+        await get_http_transport().aclose()
+
+    get_http_client.cache_clear()
+    get_http_transport.cache_clear()
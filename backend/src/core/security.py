@@ -1,15 +1,128 @@
-from passlib.context import CryptContext
+import asyncio
+import os
+import secrets
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar
 
-# from src.core.config import get_settings
+from src.core.config import get_settings
 
-crypto_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+T = TypeVar("T")
+
+
+class HasherOverloadedError(RuntimeError):
+    """Raised when the hashing pool queue is full."""
+
+
+@lru_cache
+def get_crypto_context() -> "CryptContext":
+    # passlib and its bcrypt backend load on the first hash, not at import
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# stored instead of a hash for users who cannot log in with a password
+UNUSABLE_HASH = "!"
+
+
+def _verify(plain_data: str, hashed_data: str) -> bool:
+    if hashed_data == UNUSABLE_HASH:
+        # spend the same time as for a real hash, the reply must not reveal
+        # whether the account exists or has a password
+        get_crypto_context().verify(plain_data, get_dummy_hash())
+        return False
+
+    return get_crypto_context().verify(plain_data, hashed_data)
+
+
+def _hash(data: str) -> str:
+    return get_crypto_context().hash(data)
+
+
+@lru_cache
+def get_dummy_hash() -> str:
+    # hashed with the configured cost, so checking it takes as long as a real one
+    return _hash(secrets.token_urlsafe())
+
+
+class HashingPool:
+    """Runs hashing functions in an executor with a bounded queue.
+
+    Without an executor the functions are called inline on the event loop.
+    """
+
+    def __init__(
+        self, executor: Optional[Executor], workers: int = 1, max_queue: int = 0
+    ) -> None:
+        self.executor = executor
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+
+    @property
+    def queued(self) -> int:
+        return max(self.pending - self.workers, 0)
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.executor is None:
+            return func(*args)
+
+        if self.max_queue and self.queued >= self.max_queue:
+            raise HasherOverloadedError(
+                f"hashing queue is full ({self.queued}/{self.max_queue})"
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache
+def get_hashing_pool() -> HashingPool:
+    settings = get_settings().hasher
+    workers = settings.workers or min(4, os.cpu_count() or 1)
+
+    executor: Optional[Executor]
+    match settings.executor:
+        case "thread":
+            executor = ThreadPoolExecutor(workers, thread_name_prefix="hasher")
+        case "process":
+            executor = ProcessPoolExecutor(workers)
+        case _:
+            executor = None
+
+    return HashingPool(executor, workers=workers, max_queue=settings.max_queue)
+
+
+def shutdown_hashing_pool() -> None:
+    get_hashing_pool().shutdown()
+    get_hashing_pool.cache_clear()
 
 
 class Hasher:
     @staticmethod
     def verify_data(plain_data: str, hashed_data: str) -> bool:
-        return crypto_context.verify(plain_data, hashed_data)
+        return _verify(plain_data, hashed_data)
 
     @staticmethod
     def get_data_hash(data: str) -> str:
-        return crypto_context.hash(data)
+        return _hash(data)
+
+    @staticmethod
+    async def verify_async(plain_data: str, hashed_data: str) -> bool:
+        return await get_hashing_pool().run(_verify, plain_data, hashed_data)
+
+    @staticmethod
+    async def hash_async(data: str) -> str:
+        return await get_hashing_pool().run(_hash, data)
@@ -0,0 +1,221 @@
+import importlib.util
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from multiprocessing.synchronize import Event
+from socket import socket
+from types import FrameType
+from typing import Optional
+
+import uvicorn
+
+from src.core.config import CoreSettings, get_settings
+from src.utils.logger import logger
+
+APP = "src.main:configure_app"
+# exit status when a worker fails to boot, as gunicorn uses
+WORKER_BOOT_ERROR = 3
+
+# sockets are passed to the spawned workers
+multiprocessing.allow_connection_pickling()
+spawn = multiprocessing.get_context("spawn")
+
+
+def available_cpus() -> int:
+    # the affinity mask is what a container or taskset actually allows
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def server_config(settings: CoreSettings) -> uvicorn.Config:
+    return uvicorn.Config(
+        APP,
+        factory=True,
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers or available_cpus(),
+        backlog=settings.backlog,
+        timeout_keep_alive=settings.keep_alive,
+        limit_concurrency=settings.limit_concurrency,
+        limit_max_requests=settings.max_requests,
+        timeout_graceful_shutdown=settings.graceful_timeout,
+        loop=settings.event_loop,
+        http=settings.http_protocol,
+        proxy_headers=settings.proxy_headers,
+        forwarded_allow_ips=settings.forwarded_allow_ips,
+    )
+
+
+def describe_implementation(config: uvicorn.Config) -> str:
+    def installed(name: str) -> bool:
+        return importlib.util.find_spec(name) is not None
+
+    loop = config.loop
+    if loop == "auto":
+        loop = "uvloop" if installed("uvloop") else "asyncio"
+    http = config.http
+    if http == "auto":
+        http = "httptools" if installed("httptools") else "h11"
+
+    return f"loop={loop} http={http}"
+
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn server that reports to the supervisor once it accepts requests."""
+
+    def __init__(self, config: uvicorn.Config, ready: Event) -> None:
+        super().__init__(config)
+        self.ready = ready
+
+    async def startup(self, sockets: Optional[list[socket]] = None) -> None:
+        await super().startup(sockets)
+        if self.started:
+            self.ready.set()
+
+
+def run_worker(config: uvicorn.Config, sockets: list[socket], ready: Event) -> None:
+    config.configure_logging()
+    WorkerServer(config, ready).run(sockets=sockets)
+
+
+class Worker:
+    def __init__(self, config: uvicorn.Config, sockets: list[socket]) -> None:
+        self.ready = spawn.Event()
+        self.process: SpawnProcess = spawn.Process(
+            target=run_worker, args=(config, sockets, self.ready)
+        )
+
+    def start(self) -> "Worker":
+        self.process.start()
+        return self
+
+    def stop(self, timeout: float) -> None:
+        """SIGTERM lets uvicorn drain connections, SIGKILL after `timeout`."""
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            logger.warning(f"worker {self.process.pid} did not stop, killing it")
+            self.process.kill()
+            self.process.join()
+
+
+class WorkerSupervisor:
+    """Runs the app in worker processes sharing one listening socket.
+
+    Workers that exit, for example after `max_requests`, are replaced. A
+    worker exiting before it accepted requests failed to boot, e.g. on an
+    import error or bad settings; a replacement would fail the same way, so
+    all workers are stopped and `boot_failed` is set instead. SIGHUP restarts the workers one by one: a new worker is started and the
+    old one is only stopped once its replacement accepts requests, so the
+    socket is always served. SIGINT and SIGTERM stop all workers gracefully.
+    """
+
+    def __init__(self, config: uvicorn.Config, graceful_timeout: float) -> None:
+        self.config = config
+        self.graceful_timeout = graceful_timeout
+        self.sockets: list[socket] = []
+        self.workers: list[Worker] = []
+        self.should_exit = threading.Event()
+        self.should_restart = threading.Event()
+        self.wakeup = threading.Event()
+        self.boot_failed = False
+
+    def handle_exit(self, sig: int, frame: Optional[FrameType]) -> None:
+        self.should_exit.set()
+        self.wakeup.set()
+
+    def handle_restart(self, sig: int, frame: Optional[FrameType]) -> None:
+        self.should_restart.set()
+        self.wakeup.set()
+
+    def install_signal_handlers(self) -> None:
+        signal.signal(signal.SIGINT, self.handle_exit)
+        signal.signal(signal.SIGTERM, self.handle_exit)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.handle_restart)
+
+    def spawn_worker(self) -> Worker:
+        return Worker(self.config, self.sockets).start()
+
+    def replace_exited(self) -> None:
+        for index, worker in enumerate(self.workers):
+            if worker.process.is_alive() or self.should_exit.is_set():
+                continue
+
+            worker.process.join()
+            if not worker.ready.is_set():
+                logger.error(
+                    f"worker {worker.process.pid} exited with code "
+                    f"{worker.process.exitcode} before it started, stopping"
+                )
+                self.boot_failed = True
+                self.should_exit.set()
+                return
+
+            logger.info(
+                f"worker {worker.process.pid} exited "
+                f"with code {worker.process.exitcode}, replacing it"
+            )
+            self.workers[index] = self.spawn_worker()
+
+    def restart(self) -> None:
+        logger.info(f"restarting {len(self.workers)} workers")
+        for index, old in enumerate(self.workers):
+            if self.should_exit.is_set():
+                return
+
+            new = self.spawn_worker()
+            deadline = time.monotonic() + self.config.timeout_notify
+            while not new.ready.wait(0.1):
+                if not new.process.is_alive() or time.monotonic() > deadline:
+                    logger.error("replacement worker failed to start, restart aborted")
+                    new.stop(self.graceful_timeout)
+                    return
+
+            self.workers[index] = new
+            old.stop(self.graceful_timeout)
+
+    def run(self) -> None:
+        self.sockets = [self.config.bind_socket()]
+        self.install_signal_handlers()
+        logger.info(
+            f"starting {self.config.workers} workers on "
+            f"{self.config.host}:{self.config.port} "
+            f"({describe_implementation(self.config)}), supervisor pid {os.getpid()}"
+        )
+        self.workers = [self.spawn_worker() for _ in range(self.config.workers)]
+
+        while not self.should_exit.is_set():
+            self.wakeup.wait(0.5)
+            self.wakeup.clear()
+            if self.should_restart.is_set():
+                self.should_restart.clear()
+                self.restart()
+            self.replace_exited()
+
+        logger.info("stopping workers")
+        for worker in self.workers:
+            worker.process.terminate()
+        for worker in self.workers:
+            worker.stop(self.graceful_timeout)
+        for sock in self.sockets:
+            sock.close()
+
+
+def run_server() -> None:
+    settings = get_settings().core
+    if settings.debug:
+        uvicorn.run(
+            APP, host=settings.host, port=settings.port, reload=True, factory=True
+        )
+        return
+
+    supervisor = WorkerSupervisor(server_config(settings), settings.graceful_timeout)
+    supervisor.run()
+    if supervisor.boot_failed:
+        raise SystemExit(WORKER_BOOT_ERROR)
@@ -1,51 +1,560 @@
-from typing import Generic, Optional, Type, TypeVar
+import asyncio
+import base64
+import json
+import time
+from functools import cache
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Generic,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Type,
+    TypeVar,
+    Union,
+)
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import Result, Row, bindparam, insert, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSessionTransaction
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.exc import StaleDataError
 from sqlmodel import SQLModel, delete, select
 from sqlmodel.ext.asyncio.session import AsyncSession
 from sqlmodel.sql.expression import SelectOfScalar
 
+from src.cache.entity import EntityCache, get_entity_cache
+from src.db.session import (
+    AFTER_COMMIT_KEY,
+    DATABASE_KEY,
+    PIN_PRIMARY_KEY,
+    UNIT_OF_WORK_KEY,
+    DatabaseHP,
+    read_session_for,
+)
+from src.db.write_behind import get_write_behind
 from src.utils.logger import logger
+from src.utils.single_flight import get_single_flight
 
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+T = TypeVar("T")
+
+
+class VersionConflictError(RuntimeError):
+    """Raised when a versioned row is not at the version an update expects."""
+
+
+def chunked(items: Sequence[T], size: int) -> Iterator[Sequence[T]]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+@cache
+def _keyset_adapter(model: type[SQLModel], keyset: tuple[str, ...]) -> TypeAdapter:
+    types = tuple(model.model_fields[name].annotation for name in keyset)
+    return TypeAdapter(tuple[types])  # type: ignore
+
+
+@cache
+def _find_statement(model: type[SQLModel]) -> SelectOfScalar:
+    # built once per model, so the memoized cache key and the compiled form
+    # are reused, and asyncpg sees the same SQL for its prepared statement cache
+    return select(model).where(model.id == bindparam("id"))  # type: ignore
+
+
+@cache
+def _delete_statement(model: type[SQLModel]) -> Any:
+    return delete(model).where(model.id == bindparam("id"))  # type: ignore
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     session: AsyncSession
     model: Type[ModelType]
 
+    # serve `find` from the entity cache when one is configured
+    cached: bool = False
+    # let concurrent identical `find` and shared `_read` calls run one query
+    single_flight: bool = True
+    # columns find_many orders and seeks by, the last one must be unique
+    keyset: tuple[str, ...] = ("id",)
+    # rows per statement for the *_many methods
+    bulk_chunk_size: int = 1000
+    # concurrent `build` calls in create_many/upsert_many
+    build_concurrency: int = 16
+    # unique columns upsert_many resolves conflicts on
+    upsert_conflict_on: tuple[str, ...] = ("id",)
+    # columns upsert_many overwrites on conflict, None for all but the keys
+    upsert_update_fields: Optional[tuple[str, ...]] = None
+    # frequently changing columns `update` leaves to the write-behind buffer
+    # when nothing else changes
+    write_behind_fields: tuple[str, ...] = ()
+
     def __init__(self, session: AsyncSession):
         self.session: AsyncSession = session
 
+    @property
+    def database(self) -> Optional[DatabaseHP]:
+        return self.session.info.get(DATABASE_KEY)
+
+    @property
+    def read_session(self) -> AsyncSession:
+        """Replica session for reads, or the write session once it is pinned."""
+        return read_session_for(self.session)
+
+    @property
+    def cache(self) -> Optional[EntityCache]:
+        return get_entity_cache() if self.cached else None
+
+    @property
+    def in_unit_of_work(self) -> bool:
+        return bool(self.session.info.get(UNIT_OF_WORK_KEY))
+
+    async def _commit(self) -> None:
+        """Commit, or only flush when a unit of work commits the session later."""
+        if self.in_unit_of_work:
+            await self.session.flush()
+        else:
+            await self.session.commit()
+
+    async def release_connection(self) -> None:
+        """End the read transaction before slow work like hashing a password.
+
+        No pooled connection is held meanwhile. A unit of work keeps its
+        transaction, nothing is released there.
+        """
+        if self.in_unit_of_work:
+            return
+
+        if self.database is not None:
+            await self.database.release_read_session(self.session)
+        # unlike a rollback, the commit does not expire the loaded objects
+        await self.session.commit()
+
+    def savepoint(self) -> AsyncSessionTransaction:
+        """`async with crud.savepoint():` rolls back only the block if it raises."""
+        return self.session.begin_nested()
+
+    async def _invalidate(self, *ids: Any) -> None:
+        cache = self.cache
+        if cache is None:
+            return
+
+        if self.in_unit_of_work:
+            # before the commit other requests would cache the old rows again
+            callbacks = self.session.info.setdefault(AFTER_COMMIT_KEY, [])
+            callbacks.append(lambda: cache.invalidate(self.model, *ids))
+            return
+
+        await cache.invalidate(self.model, *ids)
+
+    def _pin_primary(self) -> None:
+        if self.database is not None:
+            self.database.pin_primary(self.session)
+
+    async def _read(
+        self,
+        stmt: Any,
+        fetch: Callable[[Result], T],
+        params: Optional[dict[str, Any]] = None,
+        shared: bool = False,
+        fill_cache: bool = False,
+    ) -> T:
+        """Run a read-only statement, falling back to the primary on replica failure.
+
+        With `shared`, concurrent calls for the same statement object and
+        params run a single query. Only statements built once, with bind
+        parameters, can be shared this way. With `fill_cache`, the instance
+        read is put in the entity cache by the call that ran the query.
+        """
+        if (
+            not shared
+            or not self.single_flight
+            or self.session.info.get(PIN_PRIMARY_KEY)
+        ):
+            return await self._execute_read(stmt, fetch, params, fill_cache)
+
+        key = (
+            self.database,
+            stmt,
+            fetch,
+            tuple(sorted(params.items())) if params else (),
+        )
+        value, from_other = await get_single_flight().do(
+            key, lambda: self._execute_read(stmt, fetch, params, fill_cache)
+        )
+        if from_other:
+            # rows loaded by another request belong to its session
+            return await self._adopt(value)
+
+        return value
+
+    async def _adopt(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return [await self._adopt(item) for item in value]
+        if not isinstance(value, SQLModel):
+            return value
+
+        instance = type(value).model_validate(value.model_dump())
+        make_transient_to_detached(instance)
+        return await self.session.merge(instance, load=False)
+
+    async def _execute_read(
+        self,
+        stmt: Any,
+        fetch: Callable[[Result], T],
+        params: Optional[dict[str, Any]] = None,
+        fill_cache: bool = False,
+    ) -> T:
+        # taken before the query, invalidations from then on make the row stale
+        read_at = time.monotonic()
+        session = self.read_session
+        from_replica = session is not self.session
+        try:
+            value = fetch(await session.execute(stmt, params))
+        except (DBAPIError, OSError) as e:
+            if not from_replica:
+                raise
+            await self.database.release_read_session(self.session, failed=e)  # type: ignore
+            from_replica = False
+            value = fetch(await self.session.execute(stmt, params))
+        else:
+            if from_replica:
+                # detach loaded objects so they can be added to the write session
+                session.expunge_all()
+
+        cache = self.cache
+        if fill_cache and cache is not None and isinstance(value, SQLModel):
+            await cache.set(value, read_at=read_at, from_replica=from_replica)
+
+        return value
+
     async def find(self, id: UUID) -> Optional[ModelType]:
-        stmt: SelectOfScalar = select(self.model).where(self.model.id == id)
-        logger.debug(f"{type(stmt)}  |  {stmt = }")
-        result = await self.session.execute(stmt)
+        # after a write the request reads its own writes from the primary
+        cache = None if self.session.info.get(PIN_PRIMARY_KEY) else self.cache
+        if cache is not None:
+            instance = await cache.get(self.model, id)
+            if instance is not None:
+                make_transient_to_detached(instance)
+                return await self.session.merge(instance, load=False)
+
+        stmt = _find_statement(self.model)
+        logger.lazy("DEBUG", "{}  |  stmt = {}", type(stmt), lambda: stmt)
+
+        return await self._read(
+            stmt,
+            Result.scalar_one_or_none,
+            {"id": id},
+            shared=True,
+            fill_cache=cache is not None,
+        )
+
+    def encode_cursor(self, instance: ModelType) -> str:
+        """Opaque find_many cursor pointing right after `instance`."""
+        values = _keyset_adapter(self.model, self.keyset).dump_python(
+            tuple(getattr(instance, name) for name in self.keyset), mode="json"
+        )
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, cursor: str) -> tuple[Any, ...]:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return _keyset_adapter(self.model, self.keyset).validate_python(values)
+        except (ValueError, ValidationError) as e:
+            raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+    def _keyset_select(self, **filters: Any) -> SelectOfScalar:
+        columns = [getattr(self.model, name) for name in self.keyset]
+        return select(self.model).filter_by(**filters).order_by(*columns)
+
+    async def find_many(
+        self, limit: int = 50, after: Optional[str] = None, **filters: Any
+    ) -> list[ModelType]:
+        """Page of rows ordered by `keyset`, seeking past the `after` cursor.
 
-        return result.scalar_one_or_none()
+        Equality `filters` are applied with `filter_by`.
+        """
+        stmt = self._keyset_select(**filters).limit(limit)
+        if after is not None:
+            columns = [getattr(self.model, name) for name in self.keyset]
+            stmt = stmt.where(tuple_(*columns) > tuple_(*self.decode_cursor(after)))
+
+        return await self._read(stmt, lambda result: list(result.scalars().all()))
+
+    async def find_rows(
+        self,
+        fields: Iterable[str],
+        limit: int = 50,
+        after: Optional[str] = None,
+        **filters: Any,
+    ) -> list[Row]:
+        """Like `find_many`, but only `fields` and the keyset columns as rows.
+
+        The statement selects table columns, so no model instances are built,
+        validated or tracked by the session. Rows are named tuples that
+        `encode_cursor` and the response serializers read like instances.
+        """
+        table = self.model.__table__  # type: ignore[attr-defined]
+        names = dict.fromkeys((*fields, *self.keyset))
+        keyset = [table.c[name] for name in self.keyset]
+
+        stmt = select(*(table.c[name] for name in names)).order_by(*keyset)
+        for name, value in filters.items():
+            stmt = stmt.where(table.c[name] == value)
+        if after is not None:
+            stmt = stmt.where(tuple_(*keyset) > tuple_(*self.decode_cursor(after)))
+
+        return await self._read(stmt.limit(limit), lambda result: list(result.all()))
+
+    async def stream(
+        self, chunk_size: int = 1000, **filters: Any
+    ) -> AsyncIterator[Sequence[ModelType]]:
+        """Yield all matching rows in chunks through a server-side cursor.
+
+        The session must stay open while iterating, so the request session
+        of a streaming response cannot be used.
+        """
+        stmt = self._keyset_select(**filters).execution_options(yield_per=chunk_size)
+        session = self.read_session
+
+        result = await session.stream_scalars(stmt)
+        async for partition in result.partitions():
+            yield partition
+            # nothing else uses these objects, keep the identity map small
+            for instance in partition:
+                session.expunge(instance)
+
+    async def build(self, data: CreateSchemaType) -> ModelType:
+        return self.model.from_orm(data)
 
     async def create(self, data: CreateSchemaType) -> ModelType:
-        instance = self.model.from_orm(data)
+        instance = await self.build(data)
 
+        self._pin_primary()
         self.session.add(instance)
-        await self.session.commit()
+        await self._commit()
 
         return instance
 
-    async def update(self, instance: ModelType, data: UpdateSchemaType) -> ModelType:
-        data_dict = data.model_dump(exclude_unset=True)
-        for key, value in data_dict.items():
+    def _write_behind(self, instance: ModelType, data: dict[str, Any]) -> bool:
+        """Buffer an update of write-behind columns only, False if not possible."""
+        buffer = get_write_behind()
+        database = self.database
+        if (
+            buffer is None
+            or database is None
+            or not data
+            or not set(data) <= set(self.write_behind_fields)
+        ):
+            return False
+
+        for key, value in data.items():
+            # the session must not write the values again on a later commit
+            set_committed_value(instance, key, value)
+        buffer.add(database, self.model, instance.id, data)  # type: ignore
+
+        return True
+
+    def _check_version(self, instance: ModelType, expected: int) -> None:
+        column = self.model.__mapper__.version_id_col  # type: ignore[attr-defined]
+        if column is None:
+            raise ValueError(f"{self.model.__name__} has no version column")
+
+        current = getattr(instance, column.key)
+        if current != expected:
+            raise VersionConflictError(
+                f"{self.model.__name__} is at version {current}, not {expected}"
+            )
+
+    async def update(
+        self,
+        instance: ModelType,
+        data: Union[UpdateSchemaType, dict[str, Any]],
+        expected_version: Optional[int] = None,
+    ) -> ModelType:
+        """Update and commit `instance`, or flush it in a unit of work.
+
+        Changes to `write_behind_fields` only are applied to `instance` at
+        once but written to the database by the write-behind buffer.
+
+        Models with a `version_id_col` are updated only while the row is at
+        the version `instance` was loaded with. VersionConflictError is
+        raised when another writer got there first, or at once when
+        `expected_version`, e.g. from an If-Match header, is not the
+        version of `instance`.
+        """
+        if isinstance(data, BaseModel):
+            data = data.model_dump(exclude_unset=True)
+        if expected_version is not None:
+            # checked by the UPDATE, so the write-behind buffer is skipped
+            self._check_version(instance, expected_version)
+        elif self._write_behind(instance, data):
+            return instance
+
+        for key, value in data.items():
             setattr(instance, key, value)
 
+        self._pin_primary()
         self.session.add(instance)
-        await self.session.commit()
+        try:
+            await self._commit()
+        except StaleDataError as e:
+            raise VersionConflictError(
+                f"{self.model.__name__} was changed by another request"
+            ) from e
+        await self._invalidate(instance.id)  # type: ignore
 
         return instance
 
     async def delete(self, id: UUID) -> None:
-        async with self.session.begin():
-            stmt = delete(self.model).where(self.model.id == id)
-            await self.session.execute(stmt)
+        self._pin_primary()
+        await self.session.execute(_delete_statement(self.model), {"id": id})
+        await self._commit()
+        await self._invalidate(id)
+
+    async def build_many(self, data: Sequence[CreateSchemaType]) -> list[ModelType]:
+        semaphore = asyncio.Semaphore(self.build_concurrency)
+
+        async def build(item: CreateSchemaType) -> ModelType:
+            async with semaphore:
+                return await self.build(item)
+
+        return list(await asyncio.gather(*(build(item) for item in data)))
+
+    async def create_many(
+        self, data: Sequence[CreateSchemaType], chunk_size: Optional[int] = None
+    ) -> list[ModelType]:
+        """Insert all rows in one transaction with multi-row INSERT ... RETURNING."""
+        instances = await self.build_many(data)
+        rows = [instance.model_dump() for instance in instances]
+
+        self._pin_primary()
+        created: list[ModelType] = []
+        for chunk in chunked(rows, chunk_size or self.bulk_chunk_size):
+            stmt = insert(self.model).returning(self.model)
+            result = await self.session.scalars(stmt, chunk)
+            created.extend(result.all())
+
+        await self._commit()
+
+        return created
+
+    async def update_many(
+        self,
+        data: Sequence[tuple[UUID, Union[UpdateSchemaType, dict[str, Any]]]],
+        chunk_size: Optional[int] = None,
+    ) -> None:
+        """Update rows by primary key in one transaction using executemany."""
+        rows = []
+        for id, values in data:
+            if isinstance(values, BaseModel):
+                values = values.model_dump(exclude_unset=True)
+            rows.append({**values, "id": id})
+
+        version = self.model.__mapper__.version_id_col  # type: ignore[attr-defined]
+        self._pin_primary()
+        if version is None:
+            for chunk in chunked(rows, chunk_size or self.bulk_chunk_size):
+                await self.session.execute(update(self.model), chunk)
+        else:
+            # ORM bulk updates expect the current version of every row, so
+            # the version is bumped by a Core statement instead
+            table = self.model.__table__  # type: ignore[attr-defined]
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam("_id"))
+                .values({version.key: version + 1})
+            )
+            # executemany needs the same columns in every row
+            by_columns: dict[frozenset[str], list[dict[str, Any]]] = {}
+            for row in rows:
+                values = {key: value for key, value in row.items() if key != "id"}
+                by_columns.setdefault(frozenset(values), []).append(
+                    {**values, "_id": row["id"]}
+                )
+            for group in by_columns.values():
+                for chunk in chunked(group, chunk_size or self.bulk_chunk_size):
+                    await self.session.execute(stmt, chunk)
+
+        await self._commit()
+        await self._invalidate(*(row["id"] for row in rows))
+
+    async def delete_many(
+        self, ids: Sequence[UUID], chunk_size: Optional[int] = None
+    ) -> int:
+        deleted = 0
+
+        self._pin_primary()
+        for chunk in chunked(ids, chunk_size or self.bulk_chunk_size):
+            stmt = delete(self.model).where(self.model.id.in_(chunk))  # type: ignore
+            result = await self.session.execute(stmt)
+            deleted += result.rowcount
+
+        await self._commit()
+        await self._invalidate(*ids)
+
+        return deleted
+
+    async def upsert_many(
+        self,
+        data: Sequence[CreateSchemaType],
+        conflict_on: Optional[tuple[str, ...]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> list[ModelType]:
+        """Insert rows or update the existing ones with INSERT ... ON CONFLICT."""
+        conflict_on = conflict_on or self.upsert_conflict_on
+        dialect = self.session.get_bind().dialect.name
+        insert_for_dialect = {
+            "postgresql": postgresql.insert,
+            "sqlite": sqlite.insert,
+        }.get(dialect)
+        if insert_for_dialect is None:
+            raise ValueError(f"upsert is not supported for the {dialect} dialect")
+
+        instances = await self.build_many(data)
+        # a statement may not touch the same row twice, the last item wins
+        rows_by_key = {
+            tuple(getattr(instance, key) for key in conflict_on): instance.model_dump()
+            for instance in instances
+        }
+        rows = list(rows_by_key.values())
+
+        update_fields = self.upsert_update_fields or tuple(
+            self.model.__table__.columns.keys()  # type: ignore
+        )
+        version = self.model.__mapper__.version_id_col  # type: ignore[attr-defined]
+        update_fields = tuple(
+            field
+            for field in update_fields
+            if field != "id"
+            and field not in conflict_on
+            and (version is None or field != version.key)
+        )
+
+        self._pin_primary()
+        upserted: list[ModelType] = []
+        for chunk in chunked(rows, chunk_size or self.bulk_chunk_size):
+            stmt = insert_for_dialect(self.model).values(chunk)
+            set_ = {field: stmt.excluded[field] for field in update_fields}
+            if version is not None:
+                set_[version.key] = version + 1
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(conflict_on), set_=set_
+            ).returning(self.model)
+            result = await self.session.scalars(
+                stmt, execution_options={"populate_existing": True}
+            )
+            upserted.extend(result.all())
+
+        await self._commit()
+        await self._invalidate(*(instance.id for instance in upserted))  # type: ignore
+
+        return upserted
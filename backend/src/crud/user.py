@@ -1,7 +1,145 @@
+from datetime import datetime
+from functools import cache
+from typing import Any, AsyncIterator, Optional, Sequence, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+from sqlalchemy import Result, bindparam, or_
+from sqlmodel import select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from src.auth.availability import NameField, get_availability_index
+from src.core.security import UNUSABLE_HASH
 from src.models.user import User, UserCreate, UserUpdate
 
 from .base import CRUDBase
 
 
+@cache
+def _login_statement() -> SelectOfScalar[User]:
+    login = bindparam("login")
+    return select(User).where(or_(User.email == login, User.username == login))
+
+
+@cache
+def _taken_statement(field: NameField) -> Any:
+    return select(User.id).where(getattr(User, field) == bindparam("value")).limit(1)
+
+
 class UserCRUD(CRUDBase[User, UserCreate, UserUpdate]):
     model = User
+    cached = True
+    keyset = ("date_joined", "id")
+    upsert_conflict_on = ("email",)
+    upsert_update_fields = ("username", "hashed_password")
+    write_behind_fields = ("last_login",)
+
+    async def build(self, data: UserCreate) -> User:
+        # bcrypt runs in the hashing pool, so it must not be reached through
+        # attribute access during model validation.
+        hashed_password = await data.hash_password()
+
+        return User.model_validate(
+            data.model_dump(exclude={"password"}),
+            update={"hashed_password": hashed_password},
+        )
+
+    async def find_by_login(self, login: str) -> Optional[User]:
+        """User whose email or username is `login`.
+
+        Usernames cannot contain "@", so at most one user matches.
+        """
+        return await self._read(
+            _login_statement(), Result.scalar_one_or_none, {"login": login}, shared=True
+        )
+
+    async def is_taken(self, field: NameField, value: str) -> bool:
+        row = await self._read(
+            _taken_statement(field), Result.first, {"value": value}, shared=True
+        )
+
+        return row is not None
+
+    async def stream_names(
+        self, chunk_size: int = 5000
+    ) -> AsyncIterator[Sequence[tuple[str, str]]]:
+        """Yield (username, email) of all users in chunks."""
+        stmt = select(User.username, User.email).execution_options(yield_per=chunk_size)
+
+        result = await self.read_session.stream(stmt)
+        async for partition in result.partitions():
+            yield partition  # type: ignore
+
+    def _remember_names(self, *users: User) -> None:
+        index = get_availability_index()
+        if index is not None:
+            for user in users:
+                index.add(user.username, user.email)
+
+    async def create(self, data: UserCreate) -> User:
+        user = await super().create(data)
+        self._remember_names(user)
+        return user
+
+    async def create_many(
+        self, data: Sequence[UserCreate], chunk_size: Optional[int] = None
+    ) -> list[User]:
+        users = await super().create_many(data, chunk_size)
+        self._remember_names(*users)
+        return users
+
+    async def upsert_many(
+        self,
+        data: Sequence[UserCreate],
+        conflict_on: Optional[tuple[str, ...]] = None,
+        chunk_size: Optional[int] = None,
+    ) -> list[User]:
+        users = await super().upsert_many(data, conflict_on, chunk_size)
+        self._remember_names(*users)
+        return users
+
+    async def update(
+        self,
+        instance: User,
+        data: Union[UserUpdate, dict[str, Any]],
+        expected_version: Optional[int] = None,
+    ) -> User:
+        if isinstance(data, BaseModel):
+            data = data.model_dump(exclude_unset=True)
+
+        user = await super().update(instance, data, expected_version)
+        if "username" in data or "email" in data:
+            self._remember_names(user)
+        return user
+
+    async def update_many(
+        self,
+        data: Sequence[tuple[UUID, Union[UserUpdate, dict[str, Any]]]],
+        chunk_size: Optional[int] = None,
+    ) -> None:
+        await super().update_many(data, chunk_size)
+
+        index = get_availability_index()
+        if index is None:
+            return
+        for _, values in data:
+            if isinstance(values, BaseModel):
+                values = values.model_dump(exclude_unset=True)
+            if "username" in values or "email" in values:
+                index.add(values.get("username"), values.get("email"))
+
+    async def create_external(self, email: str, username: str) -> User:
+        """User signed up through an identity provider, without a password."""
+        user = User(
+            email=email,
+            username=username,
+            hashed_password=UNUSABLE_HASH,
+            last_login=datetime.utcnow(),
+        )
+
+        self._pin_primary()
+        self.session.add(user)
+        await self._commit()
+        self._remember_names(user)
+
+        return user
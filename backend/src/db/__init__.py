@@ -1 +1,2 @@
-from src.db.session import get_session
+from src.db.events import instrument_engine, observe_queries
+from src.db.session import get_database, get_session, get_unit_of_work
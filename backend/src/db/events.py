@@ -0,0 +1,51 @@
+import time
+from typing import Any, Callable
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+# called with the statement, its parameters, whether it ran as executemany
+# and the seconds it took
+QueryObserver = Callable[[str, Any, bool, float], None]
+
+_observers: list[QueryObserver] = []
+
+
+def observe_queries(observer: QueryObserver) -> None:
+    """Call `observer` after each statement run on an instrumented engine."""
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def _before_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(
+    conn: Any,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: Any,
+    executemany: bool,
+) -> None:
+    elapsed = time.perf_counter() - context._query_started
+    for observer in _observers:
+        observer(statement, parameters, executemany, elapsed)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Time the statements of `engine` once for all the query observers."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
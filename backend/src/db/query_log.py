@@ -0,0 +1,220 @@
+import re
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import FastAPI
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import get_settings
+from src.db.events import instrument_engine, observe_queries
+from src.db.session import get_database
+from src.utils.logger import logger
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+# $1 (asyncpg), %(name)s and %s (psycopg), :name and ? (sqlite)
+_PARAMETER = re.compile(r"\$\d+|%\(\w+\)s|%s|(?<!:):\w+|\?")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\(\?(?:\.\.\.)?\))(?:\s*,\s*\(\?(?:\.\.\.)?\))+")
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> str:
+    """Statement with literals and parameters replaced by `?`.
+
+    Lists of any length and multi-row VALUES collapse to one form, so
+    statements differing only in their values share a fingerprint.
+    """
+    normalized = _SPACE.sub(" ", statement).strip()
+    normalized = _STRING.sub("?", normalized)
+    normalized = _PARAMETER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _LIST.sub("(?...)", normalized)
+    return _ROWS.sub(r"\1...", normalized)
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Types of the bind parameters, their values may be sensitive."""
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = parameter_shape(parameters[0]) if parameters else None
+        return {"rows": len(parameters), "row": first}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+@dataclass
+class FingerprintStats:
+    fingerprint: str
+    count: int = 0
+    total_ms: float = 0
+    max_ms: float = 0
+    slow: int = 0
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.count if self.count else 0
+
+
+@dataclass
+class NPlusOneStats:
+    route: str
+    fingerprint: str
+    # requests in which the statement ran more than the threshold
+    requests: int = 0
+    max_count: int = 0
+
+
+class QueryLog:
+    """Aggregates statements by fingerprint and watches requests for N+1s.
+
+    Statements slower than `slow_ms` are logged with the shape of their
+    parameters. A request running one fingerprint more than
+    `n_plus_one_threshold` times is logged and counted per route. At most
+    `max_fingerprints` fingerprints are tracked, later ones are counted as
+    overflow only.
+    """
+
+    def __init__(
+        self,
+        slow_ms: float = 100,
+        n_plus_one_threshold: int = 10,
+        max_fingerprints: int = 1000,
+    ) -> None:
+        self.slow_ms = slow_ms
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.max_fingerprints = max_fingerprints
+        self.overflow = 0
+        self._fingerprints: dict[str, FingerprintStats] = {}
+        self._n_plus_one: dict[tuple[str, str], NPlusOneStats] = {}
+
+    def record(
+        self, statement: str, parameters: Any, executemany: bool, elapsed_ms: float
+    ) -> None:
+        key = fingerprint(statement)
+        stats = self._fingerprints.get(key)
+        if stats is None:
+            if len(self._fingerprints) >= self.max_fingerprints:
+                self.overflow += 1
+                return
+            stats = self._fingerprints[key] = FingerprintStats(key)
+
+        stats.count += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        if elapsed_ms >= self.slow_ms:
+            stats.slow += 1
+            logger.warning(
+                f"slow query ({elapsed_ms:.1f}ms): {key} "
+                f"params={parameter_shape(parameters, executemany)}"
+            )
+
+        counts = request_fingerprints.get()
+        if counts is not None:
+            counts[key] += 1
+
+    def check_request(self, route: str, counts: Counter[str]) -> None:
+        for key, count in counts.items():
+            if count <= self.n_plus_one_threshold:
+                continue
+
+            logger.warning(f"possible N+1 in {route}: {count} x {key}")
+            stats = self._n_plus_one.get((route, key))
+            if stats is None:
+                stats = self._n_plus_one[(route, key)] = NPlusOneStats(route, key)
+            stats.requests += 1
+            stats.max_count = max(stats.max_count, count)
+
+    def top(self, sort: str = "total_ms", limit: int = 50) -> list[dict[str, Any]]:
+        ranked = sorted(
+            self._fingerprints.values(),
+            key=lambda stats: getattr(stats, sort),
+            reverse=True,
+        )
+        return [{**asdict(stats), "mean_ms": stats.mean_ms} for stats in ranked[:limit]]
+
+    def n_plus_one(self) -> list[dict[str, Any]]:
+        ranked = sorted(
+            self._n_plus_one.values(), key=lambda stats: stats.requests, reverse=True
+        )
+        return [asdict(stats) for stats in ranked]
+
+    def get_stats(self) -> dict[str, int]:
+        stats = self._fingerprints.values()
+        return {
+            "fingerprints": len(self._fingerprints),
+            "overflow": self.overflow,
+            "queries": sum(fingerprint.count for fingerprint in stats),
+            "slow": sum(fingerprint.slow for fingerprint in stats),
+            "n_plus_one": sum(
+                pattern.requests for pattern in self._n_plus_one.values()
+            ),
+        }
+
+    def reset(self) -> None:
+        self.overflow = 0
+        self._fingerprints.clear()
+        self._n_plus_one.clear()
+
+
+# fingerprint -> executions in the current request
+request_fingerprints: ContextVar[Optional[Counter[str]]] = ContextVar(
+    "request_fingerprints", default=None
+)
+
+
+@lru_cache
+def get_query_log() -> QueryLog:
+    settings = get_settings().query_log
+    return QueryLog(
+        slow_ms=settings.slow_ms,
+        n_plus_one_threshold=settings.n_plus_one_threshold,
+        max_fingerprints=settings.max_fingerprints,
+    )
+
+
+def record_query(
+    statement: str, parameters: Any, executemany: bool, elapsed: float
+) -> None:
+    get_query_log().record(statement, parameters, executemany, elapsed * 1000)
+
+
+class QueryLogMiddleware:
+    """Counts the fingerprints each request runs and reports N+1 patterns."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counts: Counter[str] = Counter()
+        token = request_fingerprints.set(counts)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_fingerprints.reset(token)
+            if counts:
+                # unmatched paths are grouped like in the metrics, raw paths
+                # would let any client grow the pattern table
+                route = getattr(scope.get("route"), "path", "other")
+                get_query_log().check_request(f"{scope['method']} {route}", counts)
+
+
+def setup_query_log(app: FastAPI) -> None:
+    """Install the statement listeners and the per request N+1 check."""
+    if not get_settings().query_log.enabled:
+        return
+
+    observe_queries(record_query)
+    for engine in get_database().engines:
+        instrument_engine(engine)
+    app.add_middleware(QueryLogMiddleware)
@@ -1,14 +1,54 @@
+import asyncio
+import itertools
+import time
 from asyncio import current_task
-from typing import Any, AsyncGenerator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncGenerator, AsyncIterator, Optional, Sequence
 
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     async_scoped_session,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
 from sqlmodel.ext.asyncio.session import AsyncSession
 
-from src.core.config import get_settings
+from src.core.config import PostgresPoolSettings, get_settings
+from src.utils.logger import logger
+
+# keys used in `AsyncSession.info`
+DATABASE_KEY = "database"
+READ_SESSION_KEY = "read_session"
+REPLICA_KEY = "replica"
+PIN_PRIMARY_KEY = "pin_primary"
+UNIT_OF_WORK_KEY = "unit_of_work"
+AFTER_COMMIT_KEY = "after_commit"
+
+
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """Commit `session` once when the block succeeds, roll back if it raises.
+
+    Inside the block CRUD methods only flush. Callbacks they append to
+    `session.info[AFTER_COMMIT_KEY]` run after the commit, and are dropped
+    on rollback.
+    """
+    session.info[UNIT_OF_WORK_KEY] = True
+    try:
+        yield session
+        await session.commit()
+    except BaseException:
+        await session.rollback()
+        raise
+    finally:
+        session.info.pop(UNIT_OF_WORK_KEY, None)
+        callbacks = session.info.pop(AFTER_COMMIT_KEY, [])
+
+    for callback in callbacks:
+        await callback()
 
 
 class MultitonIfRequiredMeta(type):
@@ -37,46 +77,292 @@ class MultitonIfRequiredMeta(type):
         return cls._instances[cls][instance_name_]
 
 
+@dataclass
+class PoolStats:
+    size: int = 0
+    checked_in: int = 0
+    checked_out: int = 0
+    overflow: int = 0
+    checkouts: int = 0
+    wait_time_total: float = 0.0
+    wait_time_max: float = 0.0
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def connect(self) -> PoolProxiedConnection:
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+
+class Replica:
+    """Read replica engine with a simple circuit breaker."""
+
+    def __init__(self, engine: AsyncEngine, cooldown: float) -> None:
+        self.engine = engine
+        self.cooldown = cooldown
+        self.unhealthy_until = 0.0
+        self.get_session = _create_sessionmaker(engine)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def mark_unhealthy(self) -> None:
+        self.unhealthy_until = time.monotonic() + self.cooldown
+
+
+def _create_sessionmaker(engine: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    # expire_on_commit=False will prevent attributes from being expired after commit.
+    return async_sessionmaker(
+        bind=engine,
+        autoflush=False,
+        expire_on_commit=False,
+        class_=AsyncSession,
+    )
+
+
+def _is_disconnect(error: Exception) -> bool:
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or isinstance(
+            error, (OperationalError, InterfaceError)
+        )
+
+    return isinstance(error, OSError)
+
+
 class DatabaseHP(metaclass=MultitonIfRequiredMeta):
-    def __init__(self, url: str, echo: bool = False):
-        self.engine = create_async_engine(
+    """Primary engine for writes plus optional read replicas.
+
+    Sessions handed out by the dependencies carry the database in
+    `session.info`, so CRUD code can ask for a read session with
+    `read_session_for` and pin the request to the primary once it writes.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        echo: bool = False,
+        pool: Optional[PostgresPoolSettings] = None,
+        replicas: Sequence[str] = (),
+        replica_cooldown: float = 30,
+    ):
+        self.echo = echo
+        self.pool = pool
+        self.engine = self._create_engine(url)
+        self.get_session = _create_sessionmaker(self.engine)
+
+        self.replicas = [
+            Replica(self._create_engine(replica_url), replica_cooldown)
+            for replica_url in replicas
+        ]
+        self._next_replica = itertools.count()
+
+    def _create_engine(self, url: str) -> AsyncEngine:
+        engine_kwargs: dict[str, Any] = {}
+        if self.pool is not None:
+            engine_kwargs.update(
+                poolclass=InstrumentedQueuePool,
+                pool_size=self.pool.size,
+                max_overflow=self.pool.max_overflow,
+                pool_timeout=self.pool.timeout,
+                pool_recycle=self.pool.recycle,
+                pool_pre_ping=self.pool.pre_ping,
+            )
+            if "asyncpg" in url:
+                engine_kwargs["connect_args"] = {
+                    "prepared_statement_cache_size": self.pool.statement_cache_size,
+                    "statement_cache_size": self.pool.statement_cache_size,
+                }
+
+        return create_async_engine(
             url=url,
-            echo=echo,
+            echo=self.echo,
+            **engine_kwargs,
         )
 
-        # expire_on_commit=False will prevent attributes from being expired after commit.
-        self.get_session = async_sessionmaker(
-            bind=self.engine,
-            autoflush=False,
-            expire_on_commit=False,
-            class_=AsyncSession,
-        )
+    @property
+    def engines(self) -> list[AsyncEngine]:
+        return [self.engine, *(replica.engine for replica in self.replicas)]
 
     def get_scoped_session(self) -> async_scoped_session[AsyncSession]:
         session = async_scoped_session(
             session_factory=self.get_session,
             scopefunc=current_task,
         )
+        session.info[DATABASE_KEY] = self
         return session
 
+    def get_read_session(self) -> AsyncSession:
+        """Session on the next healthy replica, round-robin, or the primary."""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next_replica) % len(self.replicas)]
+            if replica.healthy:
+                session = replica.get_session()
+                session.info[REPLICA_KEY] = replica
+                return session
+
+        return self.get_session()
+
+    def read_session_for(self, session: AsyncSession) -> AsyncSession:
+        """Session that reads for the request owning the write `session`."""
+        if not self.replicas or session.info.get(PIN_PRIMARY_KEY):
+            return session
+
+        read_session = session.info.get(READ_SESSION_KEY)
+        if read_session is None:
+            read_session = self.get_read_session()
+            session.info[READ_SESSION_KEY] = read_session
+
+        return read_session
+
+    async def release_read_session(
+        self, session: AsyncSession, failed: Optional[Exception] = None
+    ) -> None:
+        read_session = session.info.pop(READ_SESSION_KEY, None)
+        if read_session is None:
+            return
+
+        replica = read_session.info.get(REPLICA_KEY)
+        if failed is not None and replica is not None and _is_disconnect(failed):
+            logger.warning(f"read replica marked unhealthy: {failed!r}")
+            replica.mark_unhealthy()
+
+        await read_session.close()
+
+    @staticmethod
+    def pin_primary(session: AsyncSession) -> None:
+        """Send the rest of the request's reads to the primary (read your writes)."""
+        session.info[PIN_PRIMARY_KEY] = True
+
+    async def warmup(self, connections: int) -> None:
+        """Open `connections` pooled connections per engine ahead of the first requests."""
+        for engine in self.engines:
+            pool = engine.pool
+            count = connections
+            if isinstance(pool, AsyncAdaptedQueuePool):
+                count = min(connections, pool.size())
+
+            opened = await asyncio.gather(
+                *(engine.connect().start() for _ in range(count))
+            )
+            for connection in opened:
+                await connection.close()
+
+    def pool_stats(self, engine: Optional[AsyncEngine] = None) -> PoolStats:
+        pool = (engine or self.engine).pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            return PoolStats()
+
+        stats = PoolStats(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+        if isinstance(pool, InstrumentedQueuePool):
+            stats.checkouts = pool.checkouts
+            stats.wait_time_total = pool.wait_time_total
+            stats.wait_time_max = pool.wait_time_max
+
+        return stats
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
     async def session_dependency(self) -> AsyncGenerator[AsyncSession, None]:
         async with self.get_session() as session:
-            yield session
+            session.info[DATABASE_KEY] = self
+            try:
+                yield session
+            finally:
+                await self.release_read_session(session)
+
+    async def unit_of_work_dependency(self) -> AsyncGenerator[AsyncSession, None]:
+        async with self.get_session() as session:
+            session.info[DATABASE_KEY] = self
+            try:
+                async with unit_of_work(session):
+                    yield session
+            finally:
+                await self.release_read_session(session)
 
     async def scoped_session_dependency(self) -> AsyncGenerator[AsyncSession, None]:
         session = self.get_scoped_session()
-        yield session  # type: ignore
-        await session.close()
+        try:
+            yield session  # type: ignore
+        finally:
+            await self.release_read_session(session)  # type: ignore
+            await session.close()
 
 
-# Dependency
-async def get_session() -> AsyncGenerator[AsyncSession, None]:
+def get_database() -> DatabaseHP:
     settings = get_settings()
-    db = DatabaseHP(
+    return DatabaseHP(
         url=f"{settings.postgres.uri}",
         echo=settings.core.debug,
+        pool=settings.postgres.pool,
+        replicas=[f"{uri}" for uri in settings.postgres.replicas.uris],
+        replica_cooldown=settings.postgres.replicas.cooldown,
         instance_name_=settings.core.project_name,
     )  # type: ignore
+
+
+def read_session_for(session: AsyncSession) -> AsyncSession:
+    db: Optional[DatabaseHP] = session.info.get(DATABASE_KEY)
+    if db is None:
+        return session
+
+    return db.read_session_for(session)
+
+
+async def warmup_database() -> None:
+    connections = get_settings().postgres.pool.warmup
+    if not connections:
+        return
+
+    try:
+        await get_database().warmup(connections)
+    except Exception as e:
+        logger.warning(f"database pool warm-up failed: {e!r}")
+
+
+async def dispose_database() -> None:
+    await get_database().dispose()
+
+
+# Dependency
+async def get_session() -> AsyncGenerator[AsyncSession, None]:
+    db = get_database()
+    session = db.get_scoped_session()
+    try:
+        yield session  # type: ignore
+    finally:
+        await db.release_read_session(session)  # type: ignore
+        await session.remove()
+
+
+async def get_unit_of_work() -> AsyncGenerator[AsyncSession, None]:
+    """Request session committed once, when the request succeeds."""
+    db = get_database()
     session = db.get_scoped_session()
-    yield session  # type: ignore
-    await session.close()
+    try:
+        async with unit_of_work(session):  # type: ignore
+            yield session  # type: ignore
+    finally:
+        await db.release_read_session(session)  # type: ignore
+        await session.remove()
@@ -0,0 +1,177 @@
+import asyncio
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+from sqlalchemy import bindparam, update
+from sqlmodel import SQLModel
+
+from src.cache.entity import get_entity_cache
+from src.core.config import get_settings
+from src.db.session import DatabaseHP
+from src.utils.logger import logger
+
+# pending column values by database and model, then by primary key
+Pending = dict[tuple[DatabaseHP, type[SQLModel]], dict[Any, dict[str, Any]]]
+
+
+@dataclass
+class WriteBehindStats:
+    updates: int = 0
+    # updates merged into one already pending for the same row
+    coalesced: int = 0
+    flushes: int = 0
+    flushed_rows: int = 0
+    failures: int = 0
+
+
+class WriteBehindBuffer:
+    """Coalesces column updates per row and writes them in bulk later.
+
+    Only the latest value of each column is kept per primary key, pending
+    rows are written with one executemany UPDATE per model every
+    `interval` seconds, or as soon as `max_pending` rows are waiting.
+    Rows of a failed flush are kept, unless newer values came in
+    meanwhile, and retried with the next one.
+    """
+
+    def __init__(
+        self, interval: float = 5, max_pending: int = 1000, chunk_size: int = 1000
+    ) -> None:
+        self.interval = interval
+        self.max_pending = max_pending
+        self.chunk_size = chunk_size
+        self.stats = WriteBehindStats()
+        self._pending: Pending = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._flush: Optional[asyncio.Task[None]] = None
+
+    @property
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self._pending.values())
+
+    def add(
+        self,
+        database: DatabaseHP,
+        model: type[SQLModel],
+        id: Any,
+        values: dict[str, Any],
+    ) -> None:
+        rows = self._pending.setdefault((database, model), {})
+        row = rows.get(id)
+        if row is None:
+            rows[id] = dict(values)
+        else:
+            row.update(values)
+            self.stats.coalesced += 1
+        self.stats.updates += 1
+
+        if self.pending >= self.max_pending and self._flush is None:
+            self._flush = asyncio.create_task(self.flush())
+            self._flush.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: "asyncio.Task[None]") -> None:
+        self._flush = None
+
+    async def flush(self) -> None:
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            for (database, model), rows in pending.items():
+                try:
+                    await self._write(database, model, rows)
+                except Exception as e:
+                    self.stats.failures += 1
+                    logger.warning(
+                        f"write-behind flush of {len(rows)} {model.__name__} "
+                        f"rows failed: {e!r}"
+                    )
+                    self._restore(database, model, rows)
+
+    async def _write(
+        self, database: DatabaseHP, model: type[SQLModel], rows: dict[Any, dict]
+    ) -> None:
+        # executemany needs the same columns in every row
+        by_columns: dict[frozenset[str], list[dict[str, Any]]] = {}
+        for id, values in rows.items():
+            by_columns.setdefault(frozenset(values), []).append({**values, "_id": id})
+
+        # a Core statement, rows deleted meanwhile are skipped instead of
+        # failing the ORM rowcount check
+        table = model.__table__  # type: ignore[attr-defined]
+        stmt = update(table).where(table.c.id == bindparam("_id"))
+        version = model.__mapper__.version_id_col  # type: ignore[attr-defined]
+        if version is not None:
+            # the row changed, and so must its ETag
+            stmt = stmt.values({version.key: version + 1})
+
+        async with database.get_session() as session:
+            for group in by_columns.values():
+                for start in range(0, len(group), self.chunk_size):
+                    chunk = group[start : start + self.chunk_size]
+                    await session.execute(stmt, chunk)
+            await session.commit()
+
+        self.stats.flushes += 1
+        self.stats.flushed_rows += len(rows)
+
+        cache = get_entity_cache()
+        if cache is not None:
+            await cache.invalidate(model, *rows)
+
+    def _restore(
+        self, database: DatabaseHP, model: type[SQLModel], rows: dict[Any, dict]
+    ) -> None:
+        current = self._pending.setdefault((database, model), {})
+        for id, values in rows.items():
+            current[id] = {**values, **current.get(id, {})}
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop the periodic flush and write what is still pending."""
+        if self._task is not None:
+            # under the lock, so a flush in progress is not interrupted
+            async with self._lock:
+                self._task.cancel()
+            self._task = None
+
+        await self.flush()
+        if self.pending:
+            logger.error(f"write-behind dropped {self.pending} pending rows")
+
+    def get_stats(self) -> dict[str, int]:
+        return {"pending": self.pending, **asdict(self.stats)}
+
+
+@lru_cache
+def get_write_behind() -> Optional[WriteBehindBuffer]:
+    settings = get_settings().write_behind
+    if not settings.enabled:
+        return None
+
+    return WriteBehindBuffer(
+        interval=settings.interval,
+        max_pending=settings.max_pending,
+        chunk_size=settings.chunk_size,
+    )
+
+
+async def start_write_behind() -> None:
+    buffer = get_write_behind()
+    if buffer is not None:
+        buffer.start()
+
+
+async def close_write_behind() -> None:
+    buffer = get_write_behind()
+    if buffer is not None:
+        await buffer.close()
+    get_write_behind.cache_clear()
@@ -1,13 +1,52 @@
-import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.sessions import SessionMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy.exc import IntegrityError
 
+from src.api.limits import ServiceOverloadedError
 from src.api.v1.api import api_router
+from src.auth.availability import close_availability_index, start_availability_index
+from src.auth.sessions import setup_sessions
+from src.cache.entity import close_entity_cache
 from src.core.config import get_settings
+from src.core.http import close_http_client
+from src.core.security import HasherOverloadedError, shutdown_hashing_pool
+from src.core.server import run_server
+from src.db.query_log import setup_query_log
+from src.db.session import dispose_database, warmup_database
+from src.db.write_behind import close_write_behind, start_write_behind
+from src.metrics import setup_metrics
+from src.profiling import setup_profiling
 from src.utils.logger import init_loguru_logger
 
 
+async def hasher_overloaded_handler(request: Request, exc: Exception) -> JSONResponse:
+    retry_after = get_settings().limits.retry_after
+    return JSONResponse(
+        {"detail": "Server is busy, try again later"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+async def integrity_error_handler(request: Request, exc: Exception) -> JSONResponse:
+    # unique constraints, e.g. a username registered by a concurrent request
+    return JSONResponse(
+        {"detail": "Conflicts with an existing resource"},
+        status_code=status.HTTP_409_CONFLICT,
+    )
+
+
+async def service_overloaded_handler(request: Request, exc: Exception) -> JSONResponse:
+    # typed as add_exception_handler expects, registered for this type only
+    assert isinstance(exc, ServiceOverloadedError)
+    return JSONResponse(
+        {"detail": "Server is busy, try again later"},
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 def configure_app() -> FastAPI:
     setting = get_settings()
     origins = ["*"]
@@ -16,8 +55,9 @@ def configure_app() -> FastAPI:
         title=setting.core.project_name,
         openapi_url=f"{setting.core.api_str}/openapi.json",
         debug=setting.core.debug,
+        default_response_class=ORJSONResponse,
     )
-    app.add_middleware(SessionMiddleware, secret_key=setting.core.secret_key)
+    setup_sessions(app, f"{setting.core.api_str}/auth")
     app.add_middleware(
         CORSMiddleware,
         allow_origins=origins,
@@ -25,7 +65,24 @@ def configure_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    if setting.metrics.enabled:
+        setup_metrics(app, setting.metrics.path)
+    setup_profiling(app)
+    setup_query_log(app)
     app.include_router(api_router, prefix=setting.core.api_str)
+    app.add_exception_handler(HasherOverloadedError, hasher_overloaded_handler)
+    app.add_exception_handler(ServiceOverloadedError, service_overloaded_handler)
+    app.add_exception_handler(IntegrityError, integrity_error_handler)
+    app.add_event_handler("startup", warmup_database)
+    app.add_event_handler("startup", start_availability_index)
+    app.add_event_handler("startup", start_write_behind)
+    app.add_event_handler("shutdown", shutdown_hashing_pool)
+    # pending writes need the database, flush them before it is disposed
+    app.add_event_handler("shutdown", close_write_behind)
+    app.add_event_handler("shutdown", dispose_database)
+    app.add_event_handler("shutdown", close_entity_cache)
+    app.add_event_handler("shutdown", close_http_client)
+    app.add_event_handler("shutdown", close_availability_index)
 
     init_loguru_logger(app)
 
@@ -33,13 +90,7 @@ def configure_app() -> FastAPI:
 
 
 def main() -> None:
-    setting = get_settings()
-    uvicorn.run(
-        "main:configure_app",
-        port=8000,
-        reload=setting.core.debug,
-        factory=True,
-    )
+    run_server()
 
 
 if __name__ == "__main__":
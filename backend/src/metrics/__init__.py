@@ -0,0 +1,3 @@
+from src.metrics.endpoint import setup_metrics
+from src.metrics.registry import Counter, Gauge, Histogram, registry
+from src.metrics.requests import MetricsMiddleware, record_query
@@ -0,0 +1,140 @@
+"""Gauges read from application components when metrics are scraped."""
+from typing import Iterable
+
+from src.auth.availability import get_availability_index
+from src.auth.oidc import get_oidc_cache
+from src.cache.entity import get_entity_cache
+from src.core.security import get_hashing_pool
+from src.db.query_log import get_query_log
+from src.db.session import get_database
+from src.db.write_behind import get_write_behind
+from src.metrics.registry import Gauge, LabelValues, registry
+from src.utils.single_flight import get_single_flight
+
+
+def _pool_stats() -> Iterable[tuple[LabelValues, float]]:
+    db = get_database()
+    for index, engine in enumerate(db.engines):
+        name = "primary" if index == 0 else f"replica{index}"
+        stats = db.pool_stats(engine)
+        yield (name, "size"), stats.size
+        yield (name, "checked_out"), stats.checked_out
+        yield (name, "overflow"), stats.overflow
+        yield (name, "checkouts"), stats.checkouts
+        yield (name, "wait_seconds_total"), stats.wait_time_total
+        yield (name, "wait_seconds_max"), stats.wait_time_max
+
+
+def _hasher_stats() -> Iterable[tuple[LabelValues, float]]:
+    pool = get_hashing_pool()
+    yield ("pending",), pool.pending
+    yield ("queued",), pool.queued
+
+
+def _cache_stats() -> Iterable[tuple[LabelValues, float]]:
+    cache = get_entity_cache()
+    if cache is None:
+        return
+
+    for name, value in cache.get_stats().items():
+        yield (name,), value
+
+
+def _oidc_stats() -> Iterable[tuple[LabelValues, float]]:
+    for name, value in get_oidc_cache().get_stats().items():
+        yield (name,), value
+
+
+def _availability_stats() -> Iterable[tuple[LabelValues, float]]:
+    index = get_availability_index()
+    if index is None:
+        return
+
+    for name, value in index.get_stats().items():
+        yield (name,), value
+
+
+def _write_behind_stats() -> Iterable[tuple[LabelValues, float]]:
+    buffer = get_write_behind()
+    if buffer is None:
+        return
+
+    for name, value in buffer.get_stats().items():
+        yield (name,), value
+
+
+def _single_flight_stats() -> Iterable[tuple[LabelValues, float]]:
+    for name, value in get_single_flight().get_stats().items():
+        yield (name,), value
+
+
+def _query_log_stats() -> Iterable[tuple[LabelValues, float]]:
+    for name, value in get_query_log().get_stats().items():
+        yield (name,), value
+
+
+def register_collectors() -> None:
+    registry.register(
+        Gauge(
+            "db_pool",
+            "Database connection pool state.",
+            ("engine", "stat"),
+            callback=_pool_stats,
+        )
+    )
+    registry.register(
+        Gauge(
+            "hasher_pool",
+            "Password hashing pool load.",
+            ("stat",),
+            callback=_hasher_stats,
+        )
+    )
+    registry.register(
+        Gauge(
+            "entity_cache",
+            "Entity cache counters.",
+            ("stat",),
+            callback=_cache_stats,
+        )
+    )
+    registry.register(
+        Gauge(
+            "oidc_cache",
+            "OIDC discovery and JWKS cache counters.",
+            ("stat",),
+            callback=_oidc_stats,
+        )
+    )
+    registry.register(
+        Gauge(
+            "availability_index",
+            "Username and email Bloom filter counters.",
+            ("stat",),
+            callback=_availability_stats,
+        )
+    )
+    registry.register(
+        Gauge(
+            "write_behind",
+            "Write-behind buffer, pending rows and flush counters.",
+            ("stat",),
+            callback=_write_behind_stats,
+        )
+    )
+    registry.register(
+        Gauge(
+            "single_flight",
+            "Concurrent identical reads sharing one query.",
+            ("stat",),
+            callback=_single_flight_stats,
+        )
+    )
+    registry.register(
+        Gauge(
+            "query_log",
+            "Statement fingerprints, slow statements and N+1 requests seen.",
+            ("stat",),
+            callback=_query_log_stats,
+        )
+    )
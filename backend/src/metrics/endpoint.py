@@ -0,0 +1,24 @@
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+
+from src.db.events import instrument_engine, observe_queries
+from src.db.session import get_database
+from src.metrics.collectors import register_collectors
+from src.metrics.registry import registry
+from src.metrics.requests import MetricsMiddleware, record_query
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
+
+def setup_metrics(app: FastAPI, path: str = "/metrics") -> None:
+    register_collectors()
+    observe_queries(record_query)
+    for engine in get_database().engines:
+        instrument_engine(engine)
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_route(path, metrics_endpoint, include_in_schema=False)
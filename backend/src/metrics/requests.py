@@ -0,0 +1,109 @@
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.metrics.registry import Counter, Histogram, registry
+
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+http_requests_total = registry.register(
+    Counter(
+        "http_requests_total",
+        "Handled HTTP requests.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration_seconds = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency.",
+        ("method", "route"),
+    )
+)
+http_request_db_queries = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "Database queries executed per HTTP request.",
+        ("route",),
+        buckets=QUERY_BUCKETS,
+    )
+)
+http_request_db_duration_seconds = registry.register(
+    Histogram(
+        "http_request_db_duration_seconds",
+        "Time spent in database queries per HTTP request.",
+        ("route",),
+    )
+)
+db_queries_total = registry.register(
+    Counter("db_queries_total", "Executed database queries.")
+)
+db_query_duration_seconds = registry.register(
+    Histogram("db_query_duration_seconds", "Database query latency.")
+)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db_time = 0.0
+
+
+request_stats: ContextVar[Optional[RequestStats]] = ContextVar(
+    "request_stats", default=None
+)
+
+
+def record_query(
+    statement: str, parameters: Any, executemany: bool, elapsed: float
+) -> None:
+    db_queries_total.inc()
+    db_query_duration_seconds.observe(elapsed)
+
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+class MetricsMiddleware:
+    """Records count, status and latency per route template, plus DB load."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_stats.reset(token)
+
+            # the router stores the matched route in the scope
+            route = scope.get("route")
+            path = getattr(route, "path", "other")
+            method = scope["method"]
+
+            http_requests_total.inc((method, path, str(status_code)))
+            http_request_duration_seconds.observe(elapsed, (method, path))
+            http_request_db_queries.observe(stats.queries, (path,))
+            http_request_db_duration_seconds.observe(stats.db_time, (path,))
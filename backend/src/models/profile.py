@@ -0,0 +1,42 @@
+from sqlmodel import Field, SQLModel
+
+
+class ProfileSummary(SQLModel):
+    id: int
+    method: str
+    path: str
+    # unix time
+    started_at: float
+    # "header" or "armed"
+    trigger: str
+    status_code: int
+    duration_ms: float
+    samples: int
+    query_count: int
+
+
+class ProfileQuery(SQLModel):
+    statement: str
+    duration_ms: float
+    executemany: bool
+
+
+class ProfileDetail(ProfileSummary):
+    interval_ms: float
+    # collapsed stack -> samples, GET .../collapsed has it as text
+    stacks: dict[str, int]
+    queries: list[ProfileQuery]
+    dropped_queries: int
+
+
+class ProfileArm(SQLModel):
+    # next requests to profile
+    count: int = Field(1, ge=1, le=1000)
+    path_prefix: str = ""
+
+
+class ProfileToken(SQLModel):
+    header: str
+    value: str
+    # unix time
+    expires_at: int
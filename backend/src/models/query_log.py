@@ -0,0 +1,21 @@
+from sqlmodel import SQLModel
+
+
+class QueryFingerprint(SQLModel):
+    # statement with literals and parameters replaced by ?
+    fingerprint: str
+    count: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    # executions over the slow query threshold
+    slow: int
+
+
+class NPlusOnePattern(SQLModel):
+    # "METHOD /route/{template}"
+    route: str
+    fingerprint: str
+    # requests that ran the statement more than the threshold
+    requests: int
+    max_count: int
@@ -0,0 +1,8 @@
+from sqlmodel import SQLModel
+
+
+class AccessToken(SQLModel):
+    access_token: str
+    token_type: str = "bearer"
+    # seconds until the token expires
+    expires_in: int
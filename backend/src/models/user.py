@@ -3,13 +3,21 @@ from typing import Annotated, Optional
 from uuid import UUID, uuid4
 
 from pydantic import EmailStr, SecretStr, StringConstraints
-from sqlmodel import Field, SQLModel
+from sqlalchemy import Column, Integer, text
+from sqlmodel import Field, Index, SQLModel
 
 from src.core.security import Hasher
 from src.utils.password_pydantic import PasswordValidator
 
+# bumped on every update, the ORM adds it to the WHERE clause of its updates
+# and the users endpoints derive ETags from it
+_user_version = Column("version", Integer, nullable=False, server_default=text("1"))
+
 
 class User(SQLModel, table=True):
+    __table_args__ = (Index("ix_user_date_joined_id", "date_joined", "id"),)
+    __mapper_args__ = {"version_id_col": _user_version}
+
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     email: str = Field(unique=True)
     username: str = Field(min_length=3, unique=True)
@@ -18,6 +26,7 @@ class User(SQLModel, table=True):
     is_active: bool = False
     date_joined: datetime = Field(default_factory=datetime.utcnow)
     last_login: Optional[datetime] = None
+    version: int = Field(default=1, sa_column=_user_version)
 
 
 USERNAME_PATTERN = r"^[a-zA-Z_\d]+$"
@@ -37,13 +46,39 @@ class UserCreate(SQLModel):
     username: UsernameStr
     password: PasswordSecretStr
 
-    @property
-    def hashed_password(self) -> str:
-        hashed_password = Hasher.get_data_hash(self.password.get_secret_value())
+    async def hash_password(self) -> str:
+        hashed_password = await Hasher.hash_async(self.password.get_secret_value())
 
         return hashed_password
 
 
+class UserLogin(SQLModel):
+    # email or username
+    login: str
+    password: SecretStr
+
+
+class UserRead(SQLModel):
+    id: UUID
+    email: str
+    username: str
+    is_admin: bool
+    is_active: bool
+    date_joined: datetime
+    last_login: Optional[datetime] = None
+
+
+class UserAvailability(SQLModel):
+    # None for names that were not asked about
+    username: Optional[bool] = None
+    email: Optional[bool] = None
+
+
+class UserPage(SQLModel):
+    items: list[UserRead]
+    next_cursor: Optional[str] = None
+
+
 class UserUpdate(SQLModel):
     email: Optional[EmailStr] = None
     username: Optional[UsernameStr] = None
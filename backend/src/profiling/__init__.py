@@ -0,0 +1,8 @@
+from src.profiling.middleware import (
+    ProfilingMiddleware,
+    get_profile_store,
+    get_profile_trigger,
+    record_query,
+    setup_profiling,
+)
+from src.profiling.profiler import Profile, ProfileStore, ProfileTrigger
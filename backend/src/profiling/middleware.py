@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import get_settings
+from src.db.events import instrument_engine, observe_queries
+from src.db.session import get_database
+from src.profiling.profiler import (
+    Profile,
+    ProfileStore,
+    ProfileTrigger,
+    QueryRecord,
+    StackSampler,
+)
+
+current_profile: ContextVar[Optional[Profile]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+@lru_cache
+def get_profile_store() -> ProfileStore:
+    return ProfileStore(get_settings().profiling.max_profiles)
+
+
+@lru_cache
+def get_profile_trigger() -> ProfileTrigger:
+    settings = get_settings()
+    key = hmac.new(
+        settings.core.secret_key.encode(), b"profiling", hashlib.sha256
+    ).digest()
+    return ProfileTrigger(key, settings.profiling.header)
+
+
+def record_query(
+    statement: str, parameters: Any, executemany: bool, elapsed: float
+) -> None:
+    profile = current_profile.get()
+    if profile is None:
+        return
+
+    # parameters are left out, they may hold credentials
+    if len(profile.queries) < get_settings().profiling.max_queries:
+        profile.queries.append(QueryRecord(statement, elapsed * 1000, executemany))
+    else:
+        profile.dropped_queries += 1
+
+
+class ProfilingMiddleware:
+    """Profiles requests selected by the trigger and stores the result.
+
+    The id of the stored profile is sent back in the `X-Profile-Id` header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        settings = get_settings().profiling
+        self.interval = settings.interval
+        self.max_duration = settings.max_duration
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = get_profile_trigger().match(scope["path"], scope["headers"])
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        store = get_profile_store()
+        profile = Profile(
+            id=store.next_id(),
+            method=scope["method"],
+            path=scope["path"],
+            started_at=time.time(),
+            trigger=trigger,
+            interval_ms=self.interval * 1000,
+        )
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                MutableHeaders(scope=message).append("X-Profile-Id", str(profile.id))
+            await send(message)
+
+        sampler = StackSampler(
+            profile,
+            asyncio.current_task(),  # type: ignore[arg-type]
+            asyncio.get_running_loop(),
+            self.interval,
+            self.max_duration,
+        )
+        token = current_profile.set(profile)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            profile.duration_ms = (time.perf_counter() - started) * 1000
+            current_profile.reset(token)
+            store.add(profile)
+
+
+def setup_profiling(app: FastAPI) -> None:
+    """Install the profiling middleware, nothing is added when it is disabled."""
+    if not get_settings().profiling.enabled:
+        return
+
+    observe_queries(record_query)
+    for engine in get_database().engines:
+        instrument_engine(engine)
+    app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import hmac
+import itertools
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from types import FrameType
+from typing import Any, Optional
+
+# stack suffix for samples taken while the request task was suspended
+AWAITING = "[awaiting]"
+
+
+def _label(frame: FrameType) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def _running_stack(frame: Optional[FrameType], root: Optional[FrameType]) -> list[str]:
+    """Root to leaf labels of a running thread, from the task's coroutine on."""
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        if frame is root:
+            # the event loop frames below the task are left out
+            break
+        frame = frame.f_back
+    frames.reverse()
+
+    return [_label(frame) for frame in frames]
+
+
+def _awaiting_stack(coro: Any) -> list[str]:
+    """Root to leaf labels of a suspended coroutine, following its awaits."""
+    labels = []
+    while coro is not None:
+        frame = (
+            getattr(coro, "cr_frame", None)
+            or getattr(coro, "gi_frame", None)
+            or getattr(coro, "ag_frame", None)
+        )
+        if frame is None:
+            break
+        labels.append(_label(frame))
+        coro = (
+            getattr(coro, "cr_await", None)
+            or getattr(coro, "gi_yieldfrom", None)
+            or getattr(coro, "ag_await", None)
+        )
+
+    labels.append(AWAITING)
+    return labels
+
+
+@dataclass
+class QueryRecord:
+    statement: str
+    duration_ms: float
+    executemany: bool = False
+
+
+@dataclass
+class Profile:
+    id: int
+    method: str
+    path: str
+    started_at: float
+    trigger: str
+    status_code: int = 0
+    duration_ms: float = 0
+    interval_ms: float = 0
+    samples: int = 0
+    # collapsed stack -> samples
+    stacks: dict[str, int] = field(default_factory=dict)
+    queries: list[QueryRecord] = field(default_factory=list)
+    dropped_queries: int = 0
+
+    @property
+    def query_count(self) -> int:
+        return len(self.queries) + self.dropped_queries
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl and speedscope."""
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1])
+        )
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one asyncio task from a separate thread.
+
+    While the task runs, its frames are read from the event loop thread.
+    While it is suspended, the chain of coroutines it awaits is recorded,
+    ending in AWAITING, so the profile shows wall time, not only CPU time.
+    Samples taken while other tasks run are skipped.
+    """
+
+    def __init__(
+        self,
+        profile: Profile,
+        task: "asyncio.Task[Any]",
+        loop: asyncio.AbstractEventLoop,
+        interval: float,
+        max_duration: float,
+    ) -> None:
+        super().__init__(name=f"profiler-{profile.id}", daemon=True)
+        self.profile = profile
+        self.task = task
+        self.loop = loop
+        self.interval = interval
+        self.max_duration = max_duration
+        self.thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+
+    def sample(self) -> None:
+        coro = self.task.get_coro()
+        if asyncio.current_task(self.loop) is self.task:
+            labels = _running_stack(
+                sys._current_frames().get(self.thread_id),
+                getattr(coro, "cr_frame", None),
+            )
+        elif not self.task.done():
+            # waiting for I/O, or ready and waiting for the loop
+            labels = _awaiting_stack(coro)
+        else:
+            return
+
+        stack = ";".join(labels)
+        self.profile.stacks[stack] = self.profile.stacks.get(stack, 0) + 1
+        self.profile.samples += 1
+
+    def run(self) -> None:
+        deadline = time.monotonic() + self.max_duration
+        while not self._stopped.wait(self.interval):
+            if time.monotonic() > deadline:
+                break
+            try:
+                self.sample()
+            except Exception:
+                # frames change under the sampler, skip a torn sample
+                continue
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.join()
+
+
+class ProfileTrigger:
+    """Decides which requests are profiled.
+
+    A request is profiled when it carries a valid signed header value, see
+    `sign`, or while the profiler is armed for a number of requests by an
+    admin, optionally only for paths under a prefix.
+    """
+
+    def __init__(self, key: bytes, header: str = "x-profile") -> None:
+        self.key = key
+        self.header = header.lower().encode()
+        self.armed = 0
+        self.path_prefix = ""
+
+    def sign(self, ttl: float) -> tuple[str, int]:
+        expires = int(time.time() + ttl)
+        signature = hmac.new(self.key, str(expires).encode(), hashlib.sha256)
+        return f"{expires}.{signature.hexdigest()}", expires
+
+    def verify(self, value: str) -> bool:
+        expires, _, signature = value.partition(".")
+        if not expires.isdigit() or int(expires) < time.time():
+            return False
+
+        expected = hmac.new(self.key, expires.encode(), hashlib.sha256)
+        return hmac.compare_digest(expected.hexdigest(), signature)
+
+    def arm(self, count: int, path_prefix: str = "") -> None:
+        self.armed = count
+        self.path_prefix = path_prefix
+
+    def match(self, path: str, headers: list[tuple[bytes, bytes]]) -> Optional[str]:
+        """What triggers profiling of the request, None when it is not profiled."""
+        for name, value in headers:
+            if name == self.header:
+                return "header" if self.verify(value.decode("latin-1")) else None
+
+        if self.armed and path.startswith(self.path_prefix):
+            self.armed -= 1
+            return "armed"
+
+        return None
+
+
+class ProfileStore:
+    """Ring buffer of the most recent profiles of this worker."""
+
+    def __init__(self, max_profiles: int = 50) -> None:
+        self._profiles: deque[Profile] = deque(maxlen=max_profiles)
+        self._ids = itertools.count(1)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, profile: Profile) -> None:
+        self._profiles.append(profile)
+
+    def get(self, id: int) -> Optional[Profile]:
+        for profile in self._profiles:
+            if profile.id == id:
+                return profile
+        return None
+
+    def list(self) -> list[Profile]:
+        return list(reversed(self._profiles))
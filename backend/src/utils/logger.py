@@ -1,11 +1,17 @@
 """Configure handlers and formats for application loggers."""
+import atexit
 import logging
+import queue
+import random
 import sys
+import threading
 from pprint import pformat
-from typing import Any, Optional
+from types import FunctionType, MethodType
+from typing import Any, Optional, TextIO
 
 from fastapi import FastAPI
 
+from src.core.config import LoggingSettings, get_settings
 from src.utils.singleton import SingletonMeta
 
 try:
@@ -15,12 +21,31 @@ except ImportError:
     ...
 
 
+def _evaluate(value: Any) -> Any:
+    # classes and other callables are logged as they are
+    if isinstance(value, (FunctionType, MethodType)):
+        return value()
+
+    return value
+
+
+def get_level_no(level: int | str) -> int:
+    if isinstance(level, int):
+        return level
+
+    return logging.getLevelNamesMapping()[level.upper()]
+
+
 class Logger(metaclass=SingletonMeta):
     def __init__(self, logger: Optional[Any] = None) -> None:
         if logger is None:
             logger = logging.getLogger("uvicorn")
 
         self.logger = logger
+        # records below this level are skipped without formatting
+        self.level_no = logging.DEBUG
+        # share of lazy records below INFO that are emitted
+        self.debug_sample_rate = 1.0
 
     def __getattr__(self, __name: str, /) -> Any:
         if hasattr(self.logger, __name):
@@ -28,33 +53,177 @@ class Logger(metaclass=SingletonMeta):
 
         raise AttributeError(__name)
 
+    def is_enabled(self, level: int | str) -> bool:
+        return get_level_no(level) >= self.level_no
+
+    def lazy(self, level: int | str, message: str, *args: Any, **kwargs: Any) -> None:
+        """Log `message.format(*args, **kwargs)` only if `level` is enabled.
+
+        Function and method arguments are called when the record is emitted, so
+        expensive values cost nothing while the level is disabled:
+        >>> logger.lazy("DEBUG", "statement: {}", lambda: str(stmt))
+        """
+        level_no = get_level_no(level)
+        if level_no < self.level_no:
+            return
+        if (
+            level_no < logging.INFO
+            and self.debug_sample_rate < 1
+            and random.random() >= self.debug_sample_rate
+        ):
+            return
+
+        args = tuple(_evaluate(arg) for arg in args)
+        kwargs = {key: _evaluate(value) for key, value in kwargs.items()}
+        text = message.format(*args, **kwargs)
+
+        if isinstance(self.logger, logging.Logger):
+            self.logger.log(level_no, text, stacklevel=2)
+        else:
+            self.logger.opt(depth=1).log(logging.getLevelName(level_no), text)
+
 
 logger = Logger()
 
 
+def _patch_stdlib_origin(record: dict) -> None:
+    stdlib_record: Optional[logging.LogRecord] = record["extra"].pop(
+        "stdlib_record", None
+    )
+    if stdlib_record is not None:
+        record["name"] = stdlib_record.name
+        record["module"] = stdlib_record.module
+        record["function"] = stdlib_record.funcName
+        record["line"] = stdlib_record.lineno
+
+
 class InterceptHandler(logging.Handler):
     """
     Default handler from examples in loguru documentaion.
     See https://loguru.readthedocs.io/en/stable/overview.html#entirely-compatible-with-standard-logging
+
+    The origin of the message is taken from the stdlib record
+    instead of walking the stack frames.
     """
 
+    def __init__(self, level: int = logging.NOTSET) -> None:
+        super().__init__(level)
+        self._levels: dict[str, str | int] = {}
+        self._logger = _loguru_logger.patch(_patch_stdlib_origin)  # type: ignore
+
     def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno < Logger().level_no:
+            return
+
         # Get corresponding Loguru level if it exists
-        level: str | int
-        try:
-            level = _loguru_logger.level(record.levelname).name
-        except ValueError:
-            level = record.levelno
-
-        # Find caller from where originated the logged message
-        frame, depth = logging.currentframe(), 2
-        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
-            frame = frame.f_back  # type: ignore
-            depth += 1
-
-        _loguru_logger.opt(depth=depth, exception=record.exc_info).log(
-            level, record.getMessage()
+        level = self._levels.get(record.levelname)
+        if level is None:
+            try:
+                level = _loguru_logger.level(record.levelname).name
+            except ValueError:
+                level = record.levelno
+            self._levels[record.levelname] = level
+
+        logger = self._logger.bind(stdlib_record=record)
+        if record.exc_info:
+            logger = logger.opt(exception=record.exc_info)
+
+        logger.log(level, record.getMessage())
+
+
+_STOP = object()
+
+
+class BackgroundSink:
+    """
+    Stream-like loguru sink that hands formatted messages to a writer thread,
+    so log I/O does not block the event loop.
+
+    The queue is bounded; when it is full new messages are dropped ("drop_new"),
+    the oldest queued ones are dropped ("drop_old") or the caller waits ("block").
+    """
+
+    def __init__(
+        self,
+        stream: TextIO = sys.stdout,
+        queue_size: int = 10_000,
+        batch_size: int = 256,
+        overflow: str = "drop_new",
+    ) -> None:
+        self.stream = stream
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="log-writer", daemon=True
         )
+        self._thread.start()
+        atexit.register(self.stop)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def isatty(self) -> bool:
+        return self.stream.isatty()
+
+    def write(self, message: str) -> None:
+        if not self._thread.is_alive():
+            self.stream.write(message)
+            return
+
+        try:
+            self._queue.put_nowait(message)
+            return
+        except queue.Full:
+            pass
+
+        match self.overflow:
+            case "block":
+                self._queue.put(message)
+            case "drop_old":
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                self.dropped += 1
+                self.write(message)
+            case _:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = _STOP in batch
+            self._flush([message for message in batch if message is not _STOP])
+            if stop:
+                return
+
+    def _flush(self, messages: list[str]) -> None:
+        if self.dropped > self._reported_dropped:
+            messages.append(
+                f"{self.dropped - self._reported_dropped} log messages dropped, "
+                "the log queue is full\n"
+            )
+            self._reported_dropped = self.dropped
+
+        if messages:
+            self.stream.write("".join(messages))
+            self.stream.flush()
+
+    def stop(self, timeout: float = 5) -> None:
+        """Write out queued messages and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
 
 
 def format_record(record: dict) -> str:
@@ -90,9 +259,34 @@ def get_loggers_by_names(names: list[str]) -> list[logging.Logger]:
     return [logging.getLogger(name) for name in names]
 
 
+_background_sink: Optional[BackgroundSink] = None
+
+
+def create_sink(settings: LoggingSettings) -> TextIO | BackgroundSink:
+    global _background_sink
+
+    if not settings.background:
+        return sys.stdout
+
+    _background_sink = BackgroundSink(
+        sys.stdout,
+        queue_size=settings.queue_size,
+        batch_size=settings.batch_size,
+        overflow=settings.overflow,
+    )
+    return _background_sink
+
+
+def flush_logs() -> None:
+    """Write out queued records, later records are written synchronously."""
+    if _background_sink is not None:
+        _background_sink.stop()
+
+
 def replace_logging_to_loguru(
     loggers_names: Optional[list[str]] = None,
     overwrite_loggers_names: Optional[list[str]] = None,
+    settings: Optional[LoggingSettings] = None,
 ) -> None:
     """
     Replaces logging handlers with a handler for using the custom handler.
@@ -136,8 +330,21 @@ def replace_logging_to_loguru(
         _logger.handlers = [InterceptHandler()]
 
     # set logs output, level and format
+    settings = settings or get_settings().logging
+    level = settings.level
+    if level is None:
+        level = "DEBUG" if get_settings().core.debug else "INFO"
+    level_no = get_level_no(level)
+    Logger().level_no = level_no
+    Logger().debug_sample_rate = settings.debug_sample_rate
     _loguru_logger.configure(
-        handlers=[{"sink": sys.stdout, "level": logging.DEBUG, "format": format_record}]
+        handlers=[
+            {
+                "sink": create_sink(settings),
+                "level": level_no,
+                "format": format_record,
+            }
+        ]
     )
 
 
@@ -155,3 +362,4 @@ def init_loguru_logger(
             loggers_names=loggers_names, overwrite_loggers_names=overwrite_loggers_names
         ),
     )
+    app.add_event_handler("shutdown", flush_logs)
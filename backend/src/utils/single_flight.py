@@ -0,0 +1,78 @@
+import asyncio
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    # calls that ran the function
+    leaders: int = 0
+    # calls that waited for a leader and got its result
+    coalesced: int = 0
+    # waiters that ran the function themselves after the leader failed
+    fallbacks: int = 0
+
+
+class SingleFlight:
+    """Lets concurrent calls with the same key share one in-flight call.
+
+    The first caller, the leader, awaits the function in its own task, so
+    it runs with the leader's context and session; the others wait for its
+    result. A failure or cancellation of the leader is not passed on:
+    waiters then run the function themselves. Nothing is kept once the call
+    completes, later callers start a new one.
+    """
+
+    def __init__(self) -> None:
+        self.stats = SingleFlightStats()
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self, key: Hashable, func: Callable[[], Awaitable[T]]
+    ) -> tuple[T, bool]:
+        """Result of `func`, and whether it came from another caller."""
+        future = self._calls.get(key)
+        if future is not None:
+            try:
+                # shielded, a cancelled waiter must not cancel the leader
+                value = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+            else:
+                self.stats.coalesced += 1
+                return value, True
+
+            self.stats.fallbacks += 1
+            return await func(), False
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        self.stats.leaders += 1
+        try:
+            value = await func()
+        except BaseException:
+            # waiters see a cancelled future and run the call themselves
+            future.cancel()
+            raise
+        else:
+            future.set_result(value)
+            return value, False
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def get_stats(self) -> dict[str, int]:
+        return {"in_flight": self.in_flight, **asdict(self.stats)}
+
+
+@lru_cache
+def get_single_flight() -> SingleFlight:
+    return SingleFlight()
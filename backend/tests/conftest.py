@@ -0,0 +1,34 @@
+from pathlib import Path
+from typing import AsyncIterator
+
+import httpx
+import pytest
+from sqlmodel import SQLModel
+
+# imported first, the benchmark harness sets the environment the settings need
+from benchmarks.common import create_app, create_client
+from src.db.session import DatabaseHP
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture
+async def database(tmp_path: Path) -> AsyncIterator[DatabaseHP]:
+    """Throwaway SQLite database with every table created."""
+    db = DatabaseHP(url=f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+    async with db.engine.begin() as connection:
+        await connection.run_sync(SQLModel.metadata.create_all)
+    yield db
+    await db.engine.dispose()
+
+
+@pytest.fixture
+async def client() -> AsyncIterator[httpx.AsyncClient]:
+    """Client of the application, backed by a throwaway SQLite database."""
+    app, db = await create_app()
+    async with create_client(app) as client:
+        yield client
+    await db.engine.dispose()
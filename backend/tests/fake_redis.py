@@ -0,0 +1,124 @@
+import asyncio
+import time
+from typing import Optional
+
+
+def _simple(value: bytes) -> bytes:
+    return b"+%s\r\n" % value
+
+
+def _error(message: str) -> bytes:
+    return b"-%s\r\n" % message.encode()
+
+
+def _integer(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> list[bytes]:
+    header = await reader.readuntil(b"\r\n")
+    if header[:1] != b"*":
+        raise ValueError(f"expected an array, got {header!r}")
+
+    command = []
+    for _ in range(int(header[1:-2])):
+        length = int((await reader.readuntil(b"\r\n"))[1:-2])
+        command.append((await reader.readexactly(length + 2))[:-2])
+    return command
+
+
+class FakeRedisServer:
+    """In-process server speaking enough RESP2 for RedisCacheBackend.
+
+    Handles AUTH, SELECT, GET, SET with PX, and DEL. Every other command gets
+    an error reply. Received commands are kept in `commands`.
+    """
+
+    def __init__(self, password: Optional[str] = None) -> None:
+        self.password = password
+        self.commands: list[list[bytes]] = []
+        self.connections = 0
+        # (db, key) -> (monotonic expiry or None, value)
+        self._data: dict[tuple[int, bytes], tuple[Optional[float], bytes]] = {}
+        self._server: Optional[asyncio.Server] = None
+
+    @property
+    def port(self) -> int:
+        assert self._server is not None
+        return self._server.sockets[0].getsockname()[1]
+
+    def url(self, password: Optional[str] = None, db: int = 0) -> str:
+        auth = f":{password}@" if password else ""
+        return f"redis://{auth}127.0.0.1:{self.port}/{db}"
+
+    def keys(self, db: int = 0) -> set[bytes]:
+        return {key for key_db, key in self._data if key_db == db}
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        assert self._server is not None
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        authenticated = self.password is None
+        db = 0
+        try:
+            while True:
+                command = await _read_command(reader)
+                self.commands.append(command)
+                name = command[0].decode().upper()
+
+                if name == "AUTH":
+                    authenticated = command[1].decode() == self.password
+                    reply = (
+                        _simple(b"OK")
+                        if authenticated
+                        else _error("WRONGPASS invalid username-password pair")
+                    )
+                elif not authenticated:
+                    reply = _error("NOAUTH Authentication required.")
+                elif name == "SELECT":
+                    db = int(command[1])
+                    reply = _simple(b"OK")
+                else:
+                    reply = self._execute(db, name, command[1:])
+
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _execute(self, db: int, name: str, args: list[bytes]) -> bytes:
+        now = time.monotonic()
+        match name:
+            case "GET":
+                expires_at, value = self._data.get((db, args[0]), (None, None))
+                if expires_at is not None and expires_at <= now:
+                    del self._data[(db, args[0])]
+                    value = None
+                return _bulk(value)
+            case "SET":
+                expires_at = None
+                if len(args) == 4 and args[2].upper() == b"PX":
+                    expires_at = now + int(args[3]) / 1000
+                self._data[(db, args[0])] = (expires_at, args[1])
+                return _simple(b"OK")
+            case "DEL":
+                removed = [self._data.pop((db, key), None) for key in args]
+                return _integer(sum(item is not None for item in removed))
+
+        return _error(f"ERR unknown command '{name}'")
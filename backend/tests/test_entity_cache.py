@@ -0,0 +1,140 @@
+import time
+from typing import Any, AsyncIterator
+
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from src.cache.backends import MemoryCacheBackend
+from src.cache.entity import EntityCache
+from src.crud.user import UserCRUD
+from src.db.session import DatabaseHP
+from src.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+def make_user(**values: Any) -> User:
+    return User(
+        email="alice@example.com",
+        username="alice",
+        hashed_password="!",
+        **values,
+    )
+
+
+async def is_cached(cache: EntityCache, user: User) -> bool:
+    return await cache.get(User, user.id) is not None
+
+
+@pytest.fixture
+def cache(monkeypatch: pytest.MonkeyPatch) -> EntityCache:
+    cache = EntityCache(MemoryCacheBackend(), ttl=60, replica_lag=5)
+    monkeypatch.setattr("src.crud.base.get_entity_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+async def user(database: DatabaseHP) -> AsyncIterator[User]:
+    async with database.get_session() as session:
+        user = make_user()
+        session.add(user)
+        await session.commit()
+        yield user
+
+
+async def test_set_after_invalidation_is_cached(cache: EntityCache) -> None:
+    user = make_user()
+    await cache.invalidate(User, user.id)
+
+    await cache.set(user, read_at=time.monotonic())
+
+    assert await is_cached(cache, user)
+    assert cache.stats.stale == 0
+
+
+async def test_row_read_before_invalidation_is_not_cached(cache: EntityCache) -> None:
+    user = make_user()
+    read_at = time.monotonic()
+    await cache.invalidate(User, user.id)
+
+    await cache.set(user, read_at=read_at)
+
+    assert not await is_cached(cache, user)
+    assert cache.stats.stale == 1
+
+
+async def test_replica_rows_wait_out_the_lag(cache: EntityCache) -> None:
+    user = make_user()
+    await cache.invalidate(User, user.id)
+    read_at = time.monotonic()
+
+    # the replica may not have applied the change yet
+    await cache.set(user, read_at=read_at, from_replica=True)
+    assert not await is_cached(cache, user)
+
+    await cache.set(user, read_at=read_at)
+    assert await is_cached(cache, user)
+
+
+async def test_untracked_invalidations_skip_reads_in_flight(
+    cache: EntityCache,
+) -> None:
+    cache.max_tracked = 2
+    user = make_user()
+    read_at = time.monotonic()
+    await cache.invalidate(User, *(make_user().id for _ in range(3)))
+
+    await cache.set(user, read_at=read_at)
+
+    assert not await is_cached(cache, user)
+    await cache.set(user, read_at=time.monotonic())
+    assert await is_cached(cache, user)
+
+
+async def test_find_caches_the_row(
+    database: DatabaseHP, cache: EntityCache, user: User
+) -> None:
+    async with database.get_session() as session:
+        found = await UserCRUD(session).find(user.id)
+
+    assert found is not None
+    assert await is_cached(cache, user)
+
+
+async def test_find_does_not_cache_a_row_invalidated_during_the_read(
+    database: DatabaseHP,
+    cache: EntityCache,
+    user: User,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async with database.get_session() as session:
+        execute = session.execute
+
+        async def execute_then_update(*args: Any, **kwargs: Any) -> Any:
+            result = await execute(*args, **kwargs)
+            # another request commits an update and invalidates the key
+            # after the row was read but before it is cached
+            await cache.invalidate(User, user.id)
+            return result
+
+        monkeypatch.setattr(session, "execute", execute_then_update)
+        found = await UserCRUD(session).find(user.id)
+
+    assert found is not None
+    assert not await is_cached(cache, user)
+    assert cache.stats.stale == 1
+
+
+async def test_find_reads_cached_rows_without_a_query(
+    database: DatabaseHP, cache: EntityCache, user: User
+) -> None:
+    await cache.set(user)
+
+    session = AsyncSession(database.engine)
+    try:
+        found = await UserCRUD(session).find(user.id)
+    finally:
+        await session.close()
+
+    assert found is not None and found.id == user.id
+    assert cache.stats.hits == 1
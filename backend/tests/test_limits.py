@@ -0,0 +1,151 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Request
+
+from src.api import limits
+from src.api.limits import (
+    ConcurrencyLimiter,
+    ServiceOverloadedError,
+    TokenBucketLimiter,
+    rate_limit,
+)
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    clock = Clock()
+    fake_time = SimpleNamespace(
+        monotonic=clock.monotonic, perf_counter=time.perf_counter
+    )
+    monkeypatch.setattr(limits, "time", fake_time)
+    return clock
+
+
+async def settle() -> None:
+    # lets the started tasks run up to their next wait
+    await asyncio.sleep(0.01)
+
+
+async def hold(limiter: ConcurrencyLimiter, release: asyncio.Event) -> None:
+    async with limiter.slot():
+        await release.wait()
+
+
+@pytest.mark.anyio
+async def test_waiters_get_the_released_slot() -> None:
+    limiter = ConcurrencyLimiter("test", limit=1, max_queue=1)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(limiter, release))
+    await settle()
+    waiter = asyncio.create_task(hold(limiter, asyncio.Event()))
+    await settle()
+    assert (limiter.active, limiter.waiting) == (1, 1)
+
+    release.set()
+    await holder
+    await settle()
+    assert (limiter.active, limiter.waiting) == (1, 0)
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    assert limiter.active == 0
+
+
+@pytest.mark.anyio
+async def test_full_queue_is_rejected() -> None:
+    limiter = ConcurrencyLimiter("test", limit=1, max_queue=1, retry_after=7)
+    release = asyncio.Event()
+    tasks = [asyncio.create_task(hold(limiter, release)) for _ in range(2)]
+    await settle()
+
+    with pytest.raises(ServiceOverloadedError, match="queue_full") as error:
+        async with limiter.slot():
+            pass
+    assert error.value.retry_after == 7
+    assert (limiter.active, limiter.waiting) == (1, 1)
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert (limiter.active, limiter.waiting) == (0, 0)
+
+
+@pytest.mark.anyio
+async def test_waiting_past_the_timeout_is_rejected() -> None:
+    limiter = ConcurrencyLimiter("test", limit=1, max_queue=1, queue_timeout=0.01)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(limiter, release))
+    await settle()
+
+    with pytest.raises(ServiceOverloadedError, match="queue_timeout"):
+        async with limiter.slot():
+            pass
+    # the slot is not taken by the rejected request
+    assert (limiter.active, limiter.waiting) == (1, 0)
+
+    release.set()
+    await holder
+    async with limiter.slot():
+        assert limiter.active == 1
+
+
+def test_bucket_allows_a_burst_then_refills(clock: Clock) -> None:
+    limiter = TokenBucketLimiter("test", rate=2, burst=3)
+
+    assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a") == pytest.approx(0.5)
+    # other clients have their own bucket
+    assert limiter.acquire("b") == 0
+
+    clock.now += 0.5
+    assert limiter.acquire("a") == 0
+    assert limiter.acquire("a") == pytest.approx(0.5)
+
+    # refills up to the burst only
+    clock.now += 60
+    assert [limiter.acquire("a") for _ in range(3)] == [0, 0, 0]
+    assert limiter.acquire("a") > 0
+
+
+def test_bucket_forgets_the_least_recent_clients(clock: Clock) -> None:
+    limiter = TokenBucketLimiter("test", rate=1, burst=1, max_clients=2)
+    for client in ("a", "b", "a", "c"):
+        limiter.acquire(client)
+
+    assert limiter.clients == 2
+    # "b" was dropped and starts over with a full bucket
+    assert limiter.acquire("b") == 0
+    assert limiter.acquire("c") > 0
+
+
+@pytest.mark.anyio
+async def test_rate_limit_answers_429_with_retry_after(clock: Clock) -> None:
+    limiter = TokenBucketLimiter("test", rate=0.25, burst=1)
+    dependency = rate_limit(lambda: limiter)
+    request = Request({"type": "http", "client": ("192.0.2.1", 1234), "headers": []})
+
+    await dependency(request)
+    with pytest.raises(HTTPException) as error:
+        await dependency(request)
+
+    assert error.value.status_code == 429
+    assert error.value.headers == {"Retry-After": "4"}
+
+
+@pytest.mark.anyio
+async def test_rate_limit_without_limiter_admits_everything() -> None:
+    dependency = rate_limit(lambda: None)
+    request = Request({"type": "http", "client": None, "headers": []})
+
+    for _ in range(10):
+        await dependency(request)
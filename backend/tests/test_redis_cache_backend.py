@@ -0,0 +1,93 @@
+import asyncio
+from typing import AsyncIterator
+
+import pytest
+
+from src.cache.backends import RedisCacheBackend, RedisError
+from tests.fake_redis import FakeRedisServer
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def server() -> AsyncIterator[FakeRedisServer]:
+    server = FakeRedisServer(password="secret")
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture
+async def backend(server: FakeRedisServer) -> AsyncIterator[RedisCacheBackend]:
+    backend = RedisCacheBackend(server.url(password="secret", db=2))
+    yield backend
+    await backend.close()
+
+
+async def test_set_get_delete(
+    server: FakeRedisServer, backend: RedisCacheBackend
+) -> None:
+    await backend.set("user:1", b"alice", ttl=60)
+    await backend.set("user:2", b"bob", ttl=60)
+
+    assert await backend.get("user:1") == b"alice"
+    assert await backend.get("user:3") is None
+
+    await backend.delete("user:1", "user:3")
+    assert await backend.get("user:1") is None
+    assert await backend.get("user:2") == b"bob"
+
+    # authenticated and selected once, on the only connection
+    assert server.connections == 1
+    assert server.commands[:2] == [[b"AUTH", b"secret"], [b"SELECT", b"2"]]
+    assert server.keys(db=2) == {b"user:2"}
+    assert server.keys(db=0) == set()
+
+
+async def test_delete_without_keys_sends_nothing(
+    server: FakeRedisServer, backend: RedisCacheBackend
+) -> None:
+    await backend.delete()
+
+    assert server.commands == []
+
+
+async def test_expiry(server: FakeRedisServer, backend: RedisCacheBackend) -> None:
+    await backend.set("short", b"value", ttl=0.05)
+    await backend.set("tiny", b"value", ttl=0)
+
+    assert server.commands[-2] == [b"SET", b"short", b"value", b"PX", b"50"]
+    # a TTL below a millisecond is rounded up, PX 0 is rejected by Redis
+    assert server.commands[-1][-2:] == [b"PX", b"1"]
+    assert await backend.get("short") == b"value"
+
+    await asyncio.sleep(0.1)
+    assert await backend.get("short") is None
+    assert await backend.get("tiny") is None
+
+
+async def test_error_reply_keeps_the_connection(
+    server: FakeRedisServer, backend: RedisCacheBackend
+) -> None:
+    await backend.set("key", b"value", ttl=60)
+
+    with pytest.raises(RedisError, match="unknown command 'EXPLODE'"):
+        await backend._execute("EXPLODE")
+
+    # the reply was read whole, the stream is still usable
+    assert await backend.get("key") == b"value"
+    assert server.connections == 1
+
+
+async def test_failed_auth_is_not_reused(server: FakeRedisServer) -> None:
+    backend = RedisCacheBackend(server.url(password="wrong", db=2))
+    try:
+        for _ in range(2):
+            with pytest.raises(RedisError, match="WRONGPASS"):
+                await backend.get("key")
+    finally:
+        await backend.close()
+
+    # each attempt authenticates again instead of using the rejected connection
+    assert server.connections == 2
+    assert [b"GET", b"key"] not in server.commands
@@ -0,0 +1,73 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+import uvicorn
+
+from src.core.server import WorkerSupervisor
+
+
+def fake_worker(alive: bool, ready: bool) -> Any:
+    event = threading.Event()
+    if ready:
+        event.set()
+    process = SimpleNamespace(
+        pid=1, exitcode=0, is_alive=lambda: alive, join=lambda: None
+    )
+    return SimpleNamespace(process=process, ready=event)
+
+
+@pytest.fixture
+def supervisor(monkeypatch: pytest.MonkeyPatch) -> WorkerSupervisor:
+    supervisor = WorkerSupervisor(uvicorn.Config("app:app"), graceful_timeout=1)
+    monkeypatch.setattr(supervisor, "spawn_worker", lambda: fake_worker(True, False))
+    return supervisor
+
+
+def test_workers_exiting_after_start_are_replaced(
+    supervisor: WorkerSupervisor,
+) -> None:
+    running, exited = fake_worker(True, True), fake_worker(False, True)
+    supervisor.workers = [running, exited]
+
+    supervisor.replace_exited()
+
+    assert supervisor.workers[0] is running
+    assert supervisor.workers[1] is not exited
+    assert not supervisor.should_exit.is_set()
+
+
+def test_worker_exiting_before_start_stops_the_supervisor(
+    supervisor: WorkerSupervisor,
+) -> None:
+    failed = fake_worker(False, False)
+    supervisor.workers = [fake_worker(True, True), failed]
+
+    supervisor.replace_exited()
+
+    assert supervisor.workers[1] is failed
+    assert supervisor.boot_failed
+    assert supervisor.should_exit.is_set()
+
+
+def test_boot_failure_ends_the_run(monkeypatch: pytest.MonkeyPatch) -> None:
+    config = uvicorn.Config(
+        "tests.missing_module:app", host="127.0.0.1", port=0, workers=2
+    )
+    supervisor = WorkerSupervisor(config, graceful_timeout=1)
+    # pytest keeps its own handlers, the test stops the run itself
+    monkeypatch.setattr(supervisor, "install_signal_handlers", lambda: None)
+    timeout = threading.Timer(60, supervisor.should_exit.set)
+    timeout.start()
+
+    started = time.monotonic()
+    try:
+        supervisor.run()
+    finally:
+        timeout.cancel()
+
+    assert supervisor.boot_failed
+    assert time.monotonic() - started < 60
+    assert not any(worker.process.is_alive() for worker in supervisor.workers)
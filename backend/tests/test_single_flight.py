@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from src.utils.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+class Call:
+    """Function counting its runs, each blocked until `release` is set."""
+
+    def __init__(self, result: str = "value") -> None:
+        self.result = result
+        self.runs = 0
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> str:
+        self.runs += 1
+        self.started.set()
+        await self.release.wait()
+        return self.result
+
+
+class Failing(Call):
+    async def __call__(self) -> str:
+        await super().__call__()
+        raise RuntimeError("leader failed")
+
+
+async def test_concurrent_calls_share_one_run() -> None:
+    flight = SingleFlight()
+    call = Call()
+
+    leader = asyncio.create_task(flight.do("key", call))
+    await call.started.wait()
+    waiters = [asyncio.create_task(flight.do("key", call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert flight.in_flight == 1
+
+    call.release.set()
+    assert await leader == ("value", False)
+    assert await asyncio.gather(*waiters) == [("value", True)] * 3
+
+    assert call.runs == 1
+    assert flight.in_flight == 0
+    assert flight.get_stats() == {
+        "in_flight": 0,
+        "leaders": 1,
+        "coalesced": 3,
+        "fallbacks": 0,
+    }
+
+
+async def test_different_keys_run_separately() -> None:
+    flight = SingleFlight()
+    first, second = Call("first"), Call("second")
+    first.release.set()
+    second.release.set()
+
+    results = await asyncio.gather(flight.do(1, first), flight.do(2, second))
+
+    assert results == [("first", False), ("second", False)]
+    assert (first.runs, second.runs) == (1, 1)
+
+
+async def test_later_calls_start_a_new_run() -> None:
+    flight = SingleFlight()
+    call = Call()
+    call.release.set()
+
+    await flight.do("key", call)
+    assert await flight.do("key", call) == ("value", False)
+
+    assert call.runs == 2
+
+
+async def test_leader_failure_is_not_passed_to_waiters() -> None:
+    flight = SingleFlight()
+    failing = Failing()
+    fallback = Call("fallback")
+    fallback.release.set()
+
+    leader = asyncio.create_task(flight.do("key", failing))
+    await failing.started.wait()
+    waiter = asyncio.create_task(flight.do("key", fallback))
+    await asyncio.sleep(0)
+
+    failing.release.set()
+    with pytest.raises(RuntimeError, match="leader failed"):
+        await leader
+    # the waiter ran the call itself instead of seeing the error
+    assert await waiter == ("fallback", False)
+    assert fallback.runs == 1
+    assert flight.stats.fallbacks == 1
+
+
+async def test_waiters_run_the_call_when_the_leader_is_cancelled() -> None:
+    flight = SingleFlight()
+    call = Call()
+
+    leader = asyncio.create_task(flight.do("key", call))
+    await call.started.wait()
+    waiter = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    call.release.set()
+    assert await waiter == ("value", False)
+    assert call.runs == 2
+    assert flight.stats.fallbacks == 1
+    assert flight.in_flight == 0
+
+
+async def test_cancelled_waiter_does_not_cancel_the_leader() -> None:
+    flight = SingleFlight()
+    call = Call()
+
+    leader = asyncio.create_task(flight.do("key", call))
+    await call.started.wait()
+    waiter = asyncio.create_task(flight.do("key", call))
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    call.release.set()
+    assert await leader == ("value", False)
+    assert call.runs == 1
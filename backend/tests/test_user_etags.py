@@ -0,0 +1,118 @@
+import uuid
+
+import httpx
+import pytest
+
+from src.api.responses import tag_matches
+from src.auth.tokens import get_access_tokens
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def admin() -> dict[str, str]:
+    token = get_access_tokens().issue(uuid.uuid4(), "admin", is_admin=True)
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+async def user_url(client: httpx.AsyncClient) -> str:
+    response = await client.post(
+        "/api/v1/auth/register",
+        json={
+            "email": "alice@example.com",
+            "username": "alice",
+            "password": "Password1",
+        },
+    )
+    response.raise_for_status()
+    return f"/api/v1/users/{response.json()['id']}"
+
+
+@pytest.mark.parametrize(
+    ("header", "weak", "expected"),
+    [
+        ('"1"', False, True),
+        ('"2", "1"', False, True),
+        ("*", False, True),
+        ('"2"', False, False),
+        ('W/"1"', False, False),
+        ('W/"1"', True, True),
+    ],
+)
+def test_tag_matches(header: str, weak: bool, expected: bool) -> None:
+    assert tag_matches(header, '"1"', weak=weak) is expected
+
+
+async def test_get_answers_304_while_the_tag_matches(
+    client: httpx.AsyncClient, admin: dict[str, str], user_url: str
+) -> None:
+    response = await client.get(user_url, headers=admin)
+    assert response.status_code == 200
+    tag = response.headers["ETag"]
+
+    for if_none_match in (tag, f"W/{tag}", f'"0", {tag}'):
+        response = await client.get(
+            user_url, headers={**admin, "If-None-Match": if_none_match}
+        )
+        assert response.status_code == 304
+        assert response.headers["ETag"] == tag
+        assert response.content == b""
+
+    response = await client.get(user_url, headers={**admin, "If-None-Match": '"0"'})
+    assert response.status_code == 200
+    assert response.json()["username"] == "alice"
+
+
+async def test_update_changes_the_tag(
+    client: httpx.AsyncClient, admin: dict[str, str], user_url: str
+) -> None:
+    tag = (await client.get(user_url, headers=admin)).headers["ETag"]
+
+    response = await client.patch(
+        user_url, json={"is_active": True}, headers={**admin, "If-Match": tag}
+    )
+    assert response.status_code == 200
+    assert response.json()["is_active"] is True
+    new_tag = response.headers["ETag"]
+    assert new_tag != tag
+
+    # the old tag no longer answers 304
+    response = await client.get(user_url, headers={**admin, "If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == new_tag
+
+
+async def test_update_with_a_stale_tag_answers_412(
+    client: httpx.AsyncClient, admin: dict[str, str], user_url: str
+) -> None:
+    tag = (await client.get(user_url, headers=admin)).headers["ETag"]
+    await client.patch(user_url, json={"is_active": True}, headers=admin)
+
+    response = await client.patch(
+        user_url, json={"is_active": False}, headers={**admin, "If-Match": tag}
+    )
+    assert response.status_code == 412
+    current = response.headers["ETag"]
+    assert current != tag
+
+    # nothing was written
+    response = await client.get(user_url, headers=admin)
+    assert response.json()["is_active"] is True
+    assert response.headers["ETag"] == current
+
+
+async def test_update_compares_if_match_strongly(
+    client: httpx.AsyncClient, admin: dict[str, str], user_url: str
+) -> None:
+    tag = (await client.get(user_url, headers=admin)).headers["ETag"]
+
+    response = await client.patch(
+        user_url, json={"is_active": True}, headers={**admin, "If-Match": f"W/{tag}"}
+    )
+    assert response.status_code == 412
+
+    response = await client.patch(
+        user_url, json={"is_active": True}, headers={**admin, "If-Match": "*"}
+    )
+    assert response.status_code == 200
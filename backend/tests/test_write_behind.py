@@ -0,0 +1,136 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Any
+
+import pytest
+
+from src.db.session import DatabaseHP
+from src.db.write_behind import WriteBehindBuffer
+from src.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+EARLIER = datetime(2024, 1, 1, 12, 0)
+LATER = datetime(2024, 1, 1, 13, 0)
+
+
+async def create_users(database: DatabaseHP, count: int) -> list[uuid.UUID]:
+    users = [
+        User(
+            email=f"user{index}@example.com",
+            username=f"user_{index}",
+            hashed_password="!",
+        )
+        for index in range(count)
+    ]
+    async with database.get_session() as session:
+        session.add_all(users)
+        await session.commit()
+    return [user.id for user in users]
+
+
+async def load(database: DatabaseHP, id: uuid.UUID) -> User:
+    async with database.get_session() as session:
+        user = await session.get(User, id)
+    assert user is not None
+    return user
+
+
+async def test_updates_to_a_row_are_coalesced(database: DatabaseHP) -> None:
+    [id] = await create_users(database, 1)
+    buffer = WriteBehindBuffer()
+
+    buffer.add(database, User, id, {"last_login": EARLIER})
+    buffer.add(database, User, id, {"is_active": True})
+    buffer.add(database, User, id, {"last_login": LATER})
+    assert buffer.pending == 1
+    assert (buffer.stats.updates, buffer.stats.coalesced) == (3, 2)
+
+    await buffer.flush()
+
+    user = await load(database, id)
+    assert (user.last_login, user.is_active) == (LATER, True)
+    # one write, one version bump
+    assert user.version == 2
+    assert buffer.get_stats() == {
+        "pending": 0,
+        "updates": 3,
+        "coalesced": 2,
+        "flushes": 1,
+        "flushed_rows": 1,
+        "failures": 0,
+    }
+
+
+async def test_failed_flush_keeps_rows_and_newer_values(
+    database: DatabaseHP, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    first, second = await create_users(database, 2)
+    buffer = WriteBehindBuffer()
+    buffer.add(database, User, first, {"last_login": EARLIER, "is_active": True})
+    buffer.add(database, User, second, {"last_login": EARLIER})
+
+    write = buffer._write
+
+    async def fail(*args: Any) -> None:
+        # a newer value arrives while the failing flush is running
+        buffer.add(database, User, first, {"last_login": LATER})
+        raise ConnectionError("database went away")
+
+    monkeypatch.setattr(buffer, "_write", fail)
+    await buffer.flush()
+
+    assert buffer.stats.failures == 1
+    assert buffer.pending == 2
+    assert (await load(database, first)).last_login is None
+
+    monkeypatch.setattr(buffer, "_write", write)
+    await buffer.flush()
+
+    user = await load(database, first)
+    assert (user.last_login, user.is_active) == (LATER, True)
+    assert (await load(database, second)).last_login == EARLIER
+    assert buffer.pending == 0
+
+
+async def test_rows_deleted_meanwhile_are_skipped(database: DatabaseHP) -> None:
+    [id] = await create_users(database, 1)
+    buffer = WriteBehindBuffer()
+    buffer.add(database, User, uuid.uuid4(), {"last_login": LATER})
+    buffer.add(database, User, id, {"last_login": LATER})
+
+    await buffer.flush()
+
+    assert buffer.stats.failures == 0
+    assert (await load(database, id)).last_login == LATER
+
+
+async def test_flushes_when_max_pending_rows_wait(database: DatabaseHP) -> None:
+    ids = await create_users(database, 2)
+    buffer = WriteBehindBuffer(interval=3600, max_pending=2)
+
+    for id in ids:
+        buffer.add(database, User, id, {"last_login": LATER})
+    # written by a background flush, not by the hour-long interval
+    for _ in range(100):
+        if not buffer.pending and buffer.stats.flushes:
+            break
+        await asyncio.sleep(0.01)
+
+    assert buffer.stats.flushed_rows == 2
+    for id in ids:
+        assert (await load(database, id)).last_login == LATER
+
+
+async def test_close_writes_pending_rows(database: DatabaseHP) -> None:
+    [id] = await create_users(database, 1)
+    buffer = WriteBehindBuffer(interval=3600)
+    buffer.start()
+    buffer.add(database, User, id, {"last_login": LATER})
+
+    await buffer.close()
+
+    assert buffer.pending == 0
+    assert buffer._task is None
+    assert (await load(database, id)).last_login == LATER